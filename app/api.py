@@ -1,30 +1,371 @@
+import importlib.util
 import os
-import webview
-import requests
-from collections import Counter
+import sys
+import threading
+import time
 import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-from app.deck_parser import parse_ydk_file, parse_ydke_url, OmegaFormatDecoder
-from app.card_service import fetch_card_details, get_deck_stats
+from app import metrics
+from app.card_record import CardRecord
+from app.card_store import default_cache_dir
+from app.deck_parser import Deck, SECTIONS, parse_ydk_bytes, parse_ydk_file, parse_ydke_url, OmegaFormatDecoder
+from app import card_service
+from app.card_service import (fetch_card_details, fetch_card_details_many, get_deck_stats, BATCH_CHUNK_SIZE,
+                              CancelToken, FetchCancelled)
+from app.fetch_scheduler import deadline_after
+from app.image_cache import url_image_path
+from app.lazy import lazy_import
+
+# Only imported once a card is fetched through it, asyncio takes a while to import
+async_card_service = lazy_import("app.async_card_service")
+
+# Formats understood by DeckViewerAPI.get_wants_list
+WANTS_LIST_FORMATS = ("cardmarket",)
+
+# Card fields the deck grid needs, the rest is fetched with get_card_text when a card is opened
+COMPACT_FIELDS = ("name", "image_url")
+
+# Seconds a deck load may spend fetching cards before it returns with the rest flagged missing
+DECK_LOAD_DEADLINE = 20
+
+# Estimated bytes of open decks and their memoised payloads, the least recently viewed are closed first
+OPEN_DECKS_BUDGET = 64 * 1024 * 1024
+
+# Background deck loads running at once across every DeckViewerAPI, later ones queue for a worker
+MAX_DECK_LOADS = 8
+
+# Worker pool of start_deck_load, shared so many sessions can't start a thread each
+_load_executor = ThreadPoolExecutor(max_workers=MAX_DECK_LOADS, thread_name_prefix="deck-load")
+
+
+class FetchToken(CancelToken):
+    """Generation token of a card fetch for one deck, cancelled once a newer deck takes over the view"""
+
+    def __init__(self, generation, deck_id):
+        super().__init__()
+        self.generation = generation
+        self.deck_id = deck_id
+
+
+class DeckLoad:
+    """Progress of a streaming deck load started by DeckViewerAPI.start_deck_load"""
+
+    def __init__(self, load_id, entry, token, compact=False, present=CardRecord.to_dict):
+        self.load_id = load_id
+        self.entry = entry
+        self.token = token
+        self.deck = entry.deck
+        self.compact = compact
+        self.present = present
+        self.lock = threading.Lock()
+        self.cards = []
+        self.stats = None
+        self.missing = []
+        self.atlas = None
+        self.atlas_pending = False
+        self.done = False
+        self.error = None
+
+    def add_cards(self, cards):
+        """Record a batch of resolved cards, a dict of card id -> card"""
+        if self.compact:
+            cards = [_compact_card(self.present(card), id=card_id) for card_id, card in cards.items()]
+        else:
+            cards = [self.present(card, id=card_id) for card_id, card in cards.items()]
+        with self.lock:
+            self.cards.extend(cards)
+
+    def finish(self, stats=None, error=None, missing=(), atlas=None, atlas_pending=False):
+        """Record the end of the load, with atlas_pending set when the atlas follows with set_atlas()"""
+        with self.lock:
+            self.stats = stats
+            self.atlas = atlas
+            self.atlas_pending = atlas_pending
+            self.missing = list(missing)
+            self.error = error
+            self.done = True
+
+    def set_atlas(self, atlas):
+        """Deliver the atlas of a finished load, None when none could be built"""
+        with self.lock:
+            self.atlas = atlas
+            self.atlas_pending = False
+
+    def progress(self, cursor):
+        """Return the cards resolved since cursor along with the new cursor and the load state"""
+        with self.lock:
+            return {
+                "status": "success",
+                "cards": self.cards[cursor:],
+                "cursor": len(self.cards),
+                "done": self.done,
+                "stats": self.stats,
+                "missing": self.missing,
+                "atlas": self.atlas,
+                "atlas_pending": self.atlas_pending,
+                "error": self.error,
+                "deck_id": self.entry.deck_id,
+                "generation": self.token.generation
+            }
+
+
+class ProcessedDeck:
+    """Resolved cards and stats of a deck, memoised by DeckViewerAPI until another deck is loaded"""
+
+    def __init__(self, deck, cards, stats, present=CardRecord.to_dict):
+        """present turns a cached card into the copy sent to the page"""
+        self.content_hash = deck.content_hash
+        self.cards = cards
+        self.stats = stats
+        self.missing = _missing_ids(cards)
+        self.placeholders = [card_id for card_id, card in cards.items() if card.placeholder]
+        self.sections = {}
+        self._wants_lists = {}
+        self._compact_info = None
+        self._present = present
+        self.atlas = None  # Thumbnail atlas layout, set once the deck's atlas exists
+
+        # Process each section
+        for section in SECTIONS:
+            card_ids, card_counts = deck.unique(section)
+            self.sections[section] = list(zip(card_ids.tolist(), card_counts.tolist()))
+
+        self.deck = {}
+        for section, entries in self.sections.items():
+            section_cards = []
+            for card_id, count in entries:
+                # Ensure count and ID are included
+                section_cards.append(present(cards[card_id], count=count, id=card_id))
+            self.deck[section] = section_cards
+
+    def info(self):
+        """The get_deck_info response for this deck"""
+        return {"status": "success", "deck_id": self.content_hash, "deck": self.deck, "stats": self.stats,
+                "missing": self.missing, "atlas": self.atlas}
+
+    def compact_info(self):
+        """The compact get_deck_info response: each card once with grid fields, sections as [id, count]"""
+        if self._compact_info is None:
+            card_ids = dict.fromkeys(card_id for entries in self.sections.values() for card_id, _ in entries)
+            self._compact_info = {
+                "status": "success",
+                "deck_id": self.content_hash,
+                "cards": {card_id: _compact_card(self._present(self.cards[card_id])) for card_id in card_ids},
+                "deck": {section: [[card_id, count] for card_id, count in entries]
+                         for section, entries in self.sections.items()},
+                "stats": self.stats,
+                "missing": self.missing
+            }
+        return dict(self._compact_info, atlas=self.atlas)
+
+    def memory_size(self):
+        """Rough bytes held by this deck's payloads, cards shared with the card cache are not counted"""
+        size = sys.getsizeof(self.cards)
+        size += sum(sys.getsizeof(card) for cards in self.deck.values() for card in cards)
+        if self._compact_info is not None:
+            size += sum(sys.getsizeof(card) for card in self._compact_info["cards"].values())
+        size += sum(len(text) for text in self._wants_lists.values())
+        return size
+
+    def wants_list(self, format):
+        """Deck list text in the given format, built once per format"""
+        text = self._wants_lists.get(format)
+        if text is None:
+            text = self._wants_lists[format] = self._cardmarket_wants_list()
+        return text
+
+    def _cardmarket_wants_list(self):
+        """'{count}x {name}' lines, one block per non-empty section"""
+        lines = []
+        for section in SECTIONS:
+            entries = self.sections[section]
+            if not entries:
+                continue
+            lines.append("")
+            lines.extend(f"{count}x {self.cards[card_id].name}" for card_id, count in entries)
+            if section != "side":
+                lines.append("")  # Empty line
+        return "\n".join(lines)
+
+
+class OpenDeck:
+    """A deck open in a DeckViewerAPI session, with its processed payload once it has been resolved"""
+
+    def __init__(self, deck_id, deck, name):
+        self.deck_id = deck_id
+        self.deck = deck
+        self.name = name
+        self.processed = None
+
+    def memory_size(self):
+        size = sum(self.deck[section].nbytes for section in SECTIONS)
+        if self.processed is not None:
+            size += self.processed.memory_size()
+        return size
+
+    def summary(self, active=False):
+        """The list_decks entry of this deck"""
+        return {
+            "deck_id": self.deck_id,
+            "name": self.name,
+            "main_deck": len(self.deck["main"]),
+            "extra_deck": len(self.deck["extra"]),
+            "side_deck": len(self.deck["side"]),
+            "processed": self.processed is not None,
+            "active": active
+        }
 
 
 class DeckViewerAPI:
-    """API class that will be exposed to JavaScript"""
+    """API class that will be exposed to JavaScript
+
+    Every loaded deck stays open under a deck id, the hash of its contents, so switching back to
+    it reuses its processed payload. Methods taking a deck_id default to the active deck, the one
+    loaded or switched to last. The least recently viewed decks are closed once the open decks
+    exceed decks_budget bytes.
+
+    Every load and switch to another deck starts a new generation. Card fetches still running for
+    decks other than the new active one are then cancelled, their fetched cards stay cached, and
+    get_deck_info answers them as stale. Responses carry their generation so the page can drop
+    the ones older than what it shows.
+
+    With async_fetch cards are resolved through the asyncio card service, so cancelling a fetch
+    also cancels its requests in flight. It defaults to whether aiohttp is installed.
+    """
+
+    def __init__(self, batch_chunk_size=BATCH_CHUNK_SIZE, load_deadline=DECK_LOAD_DEADLINE, image_server=None,
+                 decks_budget=OPEN_DECKS_BUDGET, async_fetch=None):
+        if async_fetch is None:
+            async_fetch = importlib.util.find_spec("aiohttp") is not None
+        self.async_fetch = async_fetch
+        self.batch_chunk_size = batch_chunk_size
+        self.load_deadline = load_deadline
+        self.image_server = image_server
+        self.decks_budget = decks_budget
+        self._decks = OrderedDict()  # deck_id -> OpenDeck, least recently viewed first
+        self._active = None
+        self._decks_lock = threading.RLock()
+        self._deck_load = None
+        self._load_count = 0
+        self._generation = 0
+        self._tokens = set()  # FetchTokens of the card fetches in progress
 
-    def __init__(self):
-        self.deck = None
-        self.card_details_cache = {}
+    @property
+    def deck(self):
+        """The active deck, None when no deck is open"""
+        entry = self._entry()
+        return entry.deck if entry is not None else None
+
+    @deck.setter
+    def deck(self, deck):
+        self._open(deck)
+
+    def _open(self, deck, name="Deck"):
+        """Open a deck, or bring it to the front and drop its memo if it is already open, and make it active
+
+        Returns the deck's entry and the generation the load started.
+        """
+        deck_id = deck.content_hash
+        with self._decks_lock:
+            entry = self._decks.get(deck_id)
+            if entry is None:
+                entry = self._decks[deck_id] = OpenDeck(deck_id, deck, name)
+            else:
+                entry.name = name
+                # Loading an open deck again is a request to refetch it, e.g. after cards failed to load
+                entry.processed = None
+                self._decks.move_to_end(deck_id)
+            self._active = deck_id
+            generation = self._supersede()
+            self._evict()
+        return entry, generation
+
+    def _supersede(self):
+        """Start a new generation, cancelling the card fetches of every deck but the active one"""
+        with self._decks_lock:
+            self._generation += 1
+            active = self._active
+            self._cancel_fetches(lambda token: token.deck_id != active)
+            return self._generation
+
+    def _cancel_fetches(self, is_stale):
+        """Cancel the card fetches whose token is_stale, cards fetched so far stay cached"""
+        with self._decks_lock:
+            stale = [token for token in self._tokens if is_stale(token)]
+            self._tokens.difference_update(stale)
+        for token in stale:
+            token.cancel()
+        if stale:
+            metrics.count("deck.superseded_fetches", len(stale))
+
+    def _track(self, entry):
+        """Token for a card fetch of an open deck, tagged with the current generation"""
+        with self._decks_lock:
+            token = FetchToken(self._generation, entry.deck_id)
+            self._tokens.add(token)
+        return token
+
+    def _untrack(self, token):
+        with self._decks_lock:
+            self._tokens.discard(token)
+
+    def _entry(self, deck_id=None):
+        """The open deck with deck_id, or the active deck when deck_id is None"""
+        with self._decks_lock:
+            return self._decks.get(self._active if deck_id is None else deck_id)
+
+    def _evict(self):
+        """Close the least recently viewed decks until the open decks fit decks_budget"""
+        with self._decks_lock:
+            sizes = {deck_id: entry.memory_size() for deck_id, entry in self._decks.items()}
+            total = sum(sizes.values())
+            for deck_id in list(self._decks):
+                if total <= self.decks_budget:
+                    break
+                if deck_id != self._active:
+                    del self._decks[deck_id]
+                    total -= sizes[deck_id]
+
+    def list_decks(self):
+        """List the open decks, the most recently viewed first"""
+        with self._decks_lock:
+            decks = [entry.summary(entry.deck_id == self._active) for entry in reversed(self._decks.values())]
+        return {"status": "success", "decks": decks, "active": self._active}
+
+    def switch_deck(self, deck_id):
+        """Make an open deck the active one"""
+        with self._decks_lock:
+            entry = self._decks.get(deck_id)
+            if entry is None:
+                return {"status": "error", "message": "Deck is not open"}
+            self._decks.move_to_end(deck_id)
+            changed = deck_id != self._active
+            self._active = deck_id
+            generation = self._supersede() if changed else self._generation
+            return dict(entry.summary(active=True), status="success", generation=generation)
+
+    def close_deck(self, deck_id):
+        """Close an open deck, the most recently viewed remaining deck becomes active if it was"""
+        with self._decks_lock:
+            if self._decks.pop(deck_id, None) is None:
+                return {"status": "error", "message": "Deck is not open"}
+            if self._active == deck_id:
+                self._active = next(reversed(self._decks), None)
+                generation = self._supersede()
+            else:
+                generation = self._generation
+                self._cancel_fetches(lambda token: token.deck_id == deck_id)
+            return {"status": "success", "active": self._active, "generation": generation}
 
     def load_ydke_url(self, ydke_url):
         """Load a deck from a YDKE URL"""
         try:
-            typed_deck = parse_ydke_url(ydke_url)
-            self.deck = {
-                "main": typed_deck.main.tolist(),
-                "extra": typed_deck.extra.tolist(),
-                "side": typed_deck.side.tolist()
-            }
-            return {"status": "success", "message": "YDKE URL loaded successfully"}
+            with metrics.timer("api.load_ydke_url"):
+                entry, generation = self._open(parse_ydke_url(ydke_url), "YDKE deck")
+            return {"status": "success", "message": "YDKE URL loaded successfully", "deck_id": entry.deck_id,
+                    "generation": generation}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
@@ -34,91 +375,334 @@ class DeckViewerAPI:
             if not os.path.exists(file_path):
                 return {"status": "error", "message": f"File not found: {file_path}"}
 
-            self.deck = parse_ydk_file(file_path)
+            with metrics.timer("api.load_ydk_file"):
+                deck = parse_ydk_file(file_path)
 
             # Validate deck structure
-            if not self.deck["main"] and not self.deck["extra"] and not self.deck["side"]:
+            if len(deck) == 0:
                 return {"status": "error", "message": "No valid cards found in the deck file."}
 
-            deck_summary = f"Loaded {len(self.deck['main'])} main deck cards, "
-            deck_summary += f"{len(self.deck['extra'])} extra deck cards, and "
-            deck_summary += f"{len(self.deck['side'])} side deck cards."
+            entry, generation = self._open(deck, os.path.splitext(os.path.basename(file_path))[0])
+
+            deck_summary = f"Loaded {len(deck['main'])} main deck cards, "
+            deck_summary += f"{len(deck['extra'])} extra deck cards, and "
+            deck_summary += f"{len(deck['side'])} side deck cards."
 
-            return {"status": "success", "message": deck_summary}
+            return {"status": "success", "message": deck_summary, "deck_id": entry.deck_id, "generation": generation}
         except Exception as e:
             error_details = traceback.format_exc()
             print(f"Error loading YDK file: {error_details}")
             return {"status": "error", "message": f"Error loading deck file: {str(e)}"}
 
+    def load_ydk_text(self, text, name="YDK deck"):
+        """Load a deck from the contents of a YDK file"""
+        try:
+            with metrics.timer("api.load_ydk_text"):
+                deck = parse_ydk_bytes(text.encode("utf-8"))
+            if len(deck) == 0:
+                return {"status": "error", "message": "No valid cards found in the deck file."}
+            entry, generation = self._open(deck, name)
+            return {"status": "success", "message": "YDK deck loaded successfully", "deck_id": entry.deck_id,
+                    "generation": generation}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
     def load_omega_format(self, encoded_data):
         """Load a deck from Omega format text"""
         try:
-            decoder = OmegaFormatDecoder()
-            self.deck = decoder.decode(encoded_data)
-            return {"status": "success", "message": "Omega format decoded successfully"}
+            with metrics.timer("api.load_omega_format"):
+                entry, generation = self._open(OmegaFormatDecoder().decode(encoded_data), "Omega deck")
+            return {"status": "success", "message": "Omega format decoded successfully", "deck_id": entry.deck_id,
+                    "generation": generation}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    def get_deck_info(self):
-        """Get detailed information about the loaded deck"""
-        if not self.deck:
-            return {"status": "error", "message": "No deck loaded"}
+    def get_deck_info(self, compact=False, deck_id=None):
+        """Get detailed information about an open deck, by default the active one
+
+        With compact set, cards are sent once keyed by id with only the fields the grid needs and
+        sections are [id, count] pairs. Descriptions are then fetched with get_card_text. A call
+        superseded by a newer deck load while it was fetching cards returns an error with 'stale' set.
+        """
+        entry = self._entry(deck_id)
+        if entry is None:
+            return {"status": "error", "message": "No deck loaded" if deck_id is None else "Deck is not open"}
 
         # Verify deck structure
-        if not isinstance(self.deck, dict) or any(key not in self.deck for key in ["main", "extra", "side"]):
+        if not isinstance(entry.deck, Deck):
             return {"status": "error", "message": "Invalid deck structure"}
 
-        result = {"status": "success"}
-        processed_deck = {"main": [], "extra": [], "side": []}
+        with metrics.timer("api.get_deck_info"):
+            # Memoised decks answer right away, only fetches need a token to be cancelled by
+            token = self._track(entry) if entry.processed is None else None
+            try:
+                processed = self._process_deck(entry, token)
+            except FetchCancelled:
+                processed = None
+            finally:
+                if token is not None:
+                    self._untrack(token)
 
-        # Process each section
-        for section in ["main", "extra", "side"]:
-            cards = []
-            card_counts = Counter(self.deck[section])
+            if processed is None or (token is not None and token.cancelled):
+                # A newer load took over the view, drop the result before it reaches the page
+                metrics.count("deck.stale_results")
+                return {"status": "error", "message": "Deck load was superseded", "stale": True,
+                        "deck_id": entry.deck_id, "generation": token.generation}
+            info = processed.compact_info() if compact else processed.info()
+            info["generation"] = self._generation if token is None else token.generation
+            return info
 
-            for card_id, count in card_counts.items():
-                card_detail = self.get_card_details(card_id)
-                card_detail["count"] = count
-                card_detail["id"] = card_id  # Ensure ID is included
-                cards.append(card_detail)
+    def _process_deck(self, entry, token=None):
+        """Resolve an open deck's cards and stats, reusing the result while the deck stays open
 
-            processed_deck[section] = cards
+        Raises FetchCancelled when token is cancelled before the cards are resolved.
+        """
+        processed = entry.processed
+        if processed is not None:
+            metrics.count("deck.memo_hits")
+            return processed
+        metrics.count("deck.memo_misses")
 
-        # Add the processed deck to the result
-        result["deck"] = processed_deck
+        # Resolve every unique card up front in as few requests as possible, within the load deadline
+        with metrics.timer("deck.fetch_cards"):
+            resolved = self.prefetch_card_details(entry.deck.all_ids().tolist(),
+                                                  deadline=deadline_after(self.load_deadline), cancel=token)
+        return self._remember(entry, resolved)
 
-        # Calculate stats that match what JavaScript expects
+    def _remember(self, entry, resolved):
+        """Build the processed deck from resolved cards, memoising it unless some cards are placeholders"""
+        deck = entry.deck
+        self._prefetch_images(resolved)
+        with metrics.timer("deck.stats"):
+            stats = self._deck_stats(deck, cards=resolved)
+        with metrics.timer("deck.present"):
+            processed = ProcessedDeck(deck, resolved, stats, present=self._present)
+        processed.atlas = self._deck_atlas(deck)
+        # Only decks whose every card was fetched are kept, so the next call retries cards that timed
+        # out, failed or were not found instead of serving their placeholders until the deck is closed
+        if not processed.placeholders:
+            entry.processed = processed
+            self._evict()
+        return processed
+
+    def get_wants_list(self, format="cardmarket", deck_id=None):
+        """Get an open deck as a wants list, e.g. the '{count}x {name}' text CardMarket accepts"""
+        entry = self._entry(deck_id)
+        if entry is None:
+            return {"status": "error", "message": "No deck loaded" if deck_id is None else "Deck is not open"}
+        if format not in WANTS_LIST_FORMATS:
+            return {"status": "error", "message": f"Unknown wants list format: {format}"}
+
+        try:
+            with metrics.timer("api.get_wants_list"):
+                text = self._process_deck(entry).wants_list(format)
+        except Exception as e:
+            print(f"Error building wants list: {e}")
+            return {"status": "error", "message": str(e)}
+        return {"status": "success", "format": format, "text": text}
+
+    def _deck_stats(self, deck, detailed=True, cards=None):
+        """Calculate stats that match what JavaScript expects"""
         stats = {
-            "main_deck": len(self.deck["main"]),
-            "extra_deck": len(self.deck["extra"]),
-            "side_deck": len(self.deck["side"])
+            "main_deck": len(deck["main"]),
+            "extra_deck": len(deck["extra"]),
+            "side_deck": len(deck["side"])
         }
 
+        if not detailed:
+            return stats
+
         # Get detailed stats
         try:
-            detailed_stats = get_deck_stats(self.deck, self.get_card_details)
+            if cards is not None:
+                # Count the cards already resolved rather than fetching missing ones again
+                detailed_stats = get_deck_stats(deck, cards.__getitem__, None)
+            else:
+                detailed_stats = get_deck_stats(deck, self.get_card_details, self.prefetch_card_details)
             # Combine basic stats with detailed stats
             stats.update(detailed_stats)
         except Exception as e:
             print(f"Error generating detailed deck stats: {e}")
             # We already have the basic stats
 
-        result["stats"] = stats
-        return result
+        return stats
+
+    def start_deck_load(self, compact=False, deck_id=None):
+        """Return an open deck's skeleton (ids and counts) right away and resolve its cards in the background
+
+        Resolved cards and finally the stats are collected with get_deck_progress. A thumbnail atlas
+        still being built arrives after done, while the progress has atlas_pending set. With compact
+        set the skeleton holds [id, count] pairs and resolved cards only carry the grid fields.
+        """
+        entry = self._entry(deck_id)
+        if entry is None:
+            return {"status": "error", "message": "No deck loaded" if deck_id is None else "Deck is not open"}
+
+        with metrics.timer("api.start_deck_load"):
+            with self._decks_lock:
+                self._load_count += 1
+                load = DeckLoad(self._load_count, entry, self._track(entry), compact=compact, present=self._present)
+                previous, self._deck_load = self._deck_load, load
+            if previous is not None and previous.entry is not entry:
+                # Only the newest load is polled, one for the same deck keeps sharing its fetches
+                previous.token.cancel()
+
+            skeleton = {}
+            for section in SECTIONS:
+                card_ids, card_counts = load.deck.unique(section)
+                if compact:
+                    skeleton[section] = [list(pair) for pair in zip(card_ids.tolist(), card_counts.tolist())]
+                else:
+                    skeleton[section] = [{"id": card_id, "count": count}
+                                         for card_id, count in zip(card_ids.tolist(), card_counts.tolist())]
+
+            _load_executor.submit(self._run_deck_load, load)
+            return {"status": "success", "load_id": load.load_id, "deck_id": entry.deck_id,
+                    "generation": load.token.generation, "deck": skeleton,
+                    "stats": self._deck_stats(load.deck, detailed=False), "atlas": self._deck_atlas(load.deck)}
+
+    def _run_deck_load(self, load):
+        start = time.perf_counter()
+        first_batch = []
+        try:
+            def on_batch(cards):
+                if not first_batch:
+                    first_batch.append(True)
+                    metrics.observe("deck_load.first_batch", (time.perf_counter() - start) * 1e3)
+                load.add_cards(cards)
+                self._prefetch_images(cards)
+
+            with metrics.timer("deck.fetch_cards"):
+                resolved = self.prefetch_card_details(load.deck.all_ids().tolist(), on_batch=on_batch,
+                                                      deadline=deadline_after(self.load_deadline), cancel=load.token)
+            processed = load.entry.processed or self._remember(load.entry, resolved)
+            # The atlas waits for every image, the stats go out first and the atlas follows
+            build_atlas = (processed.atlas is None and not processed.missing and self.image_server is not None
+                           and self.image_server.atlases is not None)
+            load.finish(stats=processed.stats, missing=_missing_ids(resolved), atlas=processed.atlas,
+                        atlas_pending=build_atlas)
+            metrics.observe("deck_load.total", (time.perf_counter() - start) * 1e3)
+            if build_atlas:
+                with metrics.timer("deck.atlas_build"):
+                    processed.atlas = self._deck_atlas(load.deck, cards=resolved)
+                load.set_atlas(processed.atlas)
+        except FetchCancelled:
+            metrics.count("deck.stale_results")
+            load.finish(error="Deck load was superseded")
+        except Exception as e:
+            print(f"Error loading deck cards: {e}")
+            load.finish(error=str(e))
+        finally:
+            self._untrack(load.token)
+
+    def get_deck_progress(self, load_id, cursor=0):
+        """Get the cards resolved since cursor for a load started by start_deck_load"""
+        load = self._deck_load
+        if load is None or load.load_id != load_id:
+            return {"status": "error", "message": "Deck load was superseded"}
+        return load.progress(cursor)
 
     def get_card_details(self, card_id):
-        """Get card details from cache or from API"""
-        # Check cache first
-        if card_id in self.card_details_cache:
-            return self.card_details_cache[card_id]
+        """Get card details from the shared card cache or from the API"""
+        return fetch_card_details(card_id)
+
+    def _present(self, card, **extra):
+        """Copy of a cached card for the page, with its image served by the local image server"""
+        card = card.to_dict(**extra)
+        if self.image_server is not None:
+            card["image_url"] = self.image_server.local_url(card["image_url"])
+        return card
+
+    def _prefetch_images(self, cards):
+        """Start downloading the images of resolved cards into the local image cache"""
+        if self.image_server is not None:
+            self.image_server.prefetch(card.image_url for card in cards.values())
 
-        # Fetch and cache card details
-        card_details = fetch_card_details(card_id)
-        self.card_details_cache[card_id] = card_details
-        return card_details
+    def _deck_atlas(self, deck, cards=None):
+        """Layout and URL of the deck's thumbnail atlas, None without one
+
+        Given the deck's resolved cards a missing atlas is built, which waits for their images.
+        """
+        atlases = self.image_server.atlases if self.image_server is not None else None
+        if atlases is None or len(deck) == 0:
+            return None
+
+        try:
+            layout = atlases.get(deck.content_hash)
+            if layout is None and cards is not None:
+                layout = atlases.build(deck.content_hash, {card_id: url_image_path(card.image_url)
+                                                           for card_id, card in cards.items()})
+        except Exception as e:
+            print(f"Error building deck atlas: {e}")
+            return None
+        if layout is None:
+            return None
+        return dict(layout, url=self.image_server.url + layout["path"])
+
+    def get_card_text(self, card_id):
+        """Get the full details of one card, including its description, for the card preview"""
+        try:
+            with metrics.timer("api.get_card_text"):
+                card = self.get_card_details(int(card_id))
+            return {"status": "success", "card": self._present(card, id=int(card_id))}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def prefetch_card_details(self, card_ids, on_batch=None, deadline=None, cancel=None):
+        """Fetch all uncached cards in bulk into the shared card cache and return them by id
+
+        When given, on_batch receives dicts of cards as they become available, cached ones first.
+        Cards still unresolved at the deadline come back flagged as missing. Once cancel is
+        cancelled the fetch stops and raises FetchCancelled.
+        """
+        if self.async_fetch:
+            return async_card_service.fetch_card_details_many_sync(card_ids, chunk_size=self.batch_chunk_size,
+                                                                   on_batch=on_batch, deadline=deadline,
+                                                                   cancel=cancel)
+        return fetch_card_details_many(card_ids, chunk_size=self.batch_chunk_size, on_batch=on_batch,
+                                       deadline=deadline, cancel=cancel)
+
+    def get_cache_stats(self):
+        """Get the hit/miss/eviction counters of the shared card cache"""
+        return card_service.card_cache.stats()
+
+    def get_metrics(self):
+        """Get the recorded stage timings, counters and HTTP latency histograms along with cache counters"""
+        report = metrics.snapshot()
+        report["card_cache"] = card_service.card_cache.stats()
+        scheduler = card_service.scheduler
+        report["scheduler"] = scheduler.stats() if scheduler is not None else None
+        report["image_cache"] = self.image_server.cache.info() if self.image_server is not None else None
+        return dict(report, status="success")
+
+    def set_metrics_enabled(self, enabled=True):
+        """Start or stop recording metrics, the debug panel turns them on while it is open"""
+        was_enabled = metrics.enabled
+        metrics.enable(enabled)
+        return {"status": "success", "enabled": metrics.enabled, "was_enabled": was_enabled}
+
+    def reset_metrics(self):
+        """Forget every recorded timing and counter"""
+        metrics.reset()
+        return {"status": "success"}
+
+    def dump_metrics(self, path=None):
+        """Write get_metrics() to a JSON file, by default a timestamped one in the cache directory"""
+        try:
+            if path is None:
+                path = os.path.join(default_cache_dir(), "metrics", time.strftime("metrics-%Y%m%d-%H%M%S.json"))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            metrics.dump(path, self.get_metrics())
+            return {"status": "success", "path": path}
+        except Exception as e:
+            print(f"Error writing metrics: {e}")
+            return {"status": "error", "message": str(e)}
 
     def open_file_dialog(self):
         """Open a file dialog to select a YDK file"""
+        # Only the desktop window has dialogs, the HTTP service runs without pywebview
+        import webview
+
         try:
             result = webview.windows[0].create_file_dialog(webview.OPEN_DIALOG,
                                                            file_types=('YDK Files (*.ydk)', 'All files (*.*)'))
@@ -127,4 +711,16 @@ class DeckViewerAPI:
             return None
         except Exception as e:
             print(f"Error opening file dialog: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+def _missing_ids(cards):
+    """Ids of the cards a deck load had to give up on"""
+    return [card_id for card_id, card in cards.items() if card.missing]
+
+
+def _compact_card(card, **extra):
+    """Only the COMPACT_FIELDS of a card"""
+    compact = {field: card.get(field) for field in COMPACT_FIELDS}
+    compact.update(extra)
+    return compact
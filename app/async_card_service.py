@@ -0,0 +1,277 @@
+import asyncio
+import atexit
+from concurrent.futures import CancelledError
+import threading
+import time
+import weakref
+
+from app import card_service, metrics
+from app.card_service import (BATCH_CHUNK_SIZE, MAX_WORKERS, BulkFetch, FetchCancelled, get_deck_stats,
+                              placeholder_card, resolve_local, settle_chunk, store_cards)
+from app.fetch_scheduler import DeadlineExceeded, RETRY_STATUSES, seconds_left
+
+# Connections kept open to the API by one event loop's HTTP session
+MAX_CONCURRENCY = MAX_WORKERS
+
+# Seconds between checks for a free slot of the shared concurrency limit
+SLOT_POLL_INTERVAL = 0.005
+
+# One AsyncFetcher per event loop, an aiohttp session cannot be shared between loops
+_fetchers = weakref.WeakKeyDictionary()
+
+# Event loop run by a background thread for callers without one, started by submit()
+_loop = None
+_loop_lock = threading.Lock()
+
+
+class AsyncFetcher:
+    """Send GET requests with aiohttp through the card service's request scheduler
+
+    The token bucket, the AIMD concurrency limit, the counters, timeouts and retry policy are
+    those of card_service.scheduler, so threads and coroutines fetching cards at the same time
+    share one rate limit, back off together on 429s and show up together in get_metrics.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_concurrency))
+        self._aiohttp = aiohttp
+        # Connection level failures worth retrying
+        self._retry_exceptions = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+    @property
+    def scheduler(self):
+        """The card service's current scheduler, configure_fetcher() may have replaced it"""
+        return card_service._fetcher()
+
+    def _timeout(self, deadline):
+        connect, read = self.scheduler.request_timeout(deadline)
+        return self._aiohttp.ClientTimeout(connect=connect, sock_read=read)
+
+    async def _acquire_token(self, deadline):
+        while True:
+            wait = self.scheduler.bucket.reserve()
+            if not wait:
+                return
+            remaining = seconds_left(deadline)
+            if remaining is not None and remaining < wait:
+                raise DeadlineExceeded("Deadline passed waiting for the rate limiter")
+            await asyncio.sleep(wait)
+
+    async def _acquire_slot(self, deadline):
+        concurrency = self.scheduler.concurrency
+        while not concurrency.try_acquire():
+            remaining = seconds_left(deadline)
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded("Deadline passed waiting for a request slot")
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+
+    async def get_json(self, url, params=None, deadline=None):
+        """GET url, retrying 429/5xx responses and connection errors, returns (status, decoded body)
+
+        The body is only decoded for 200 responses, it is None otherwise. Raises DeadlineExceeded
+        when deadline passes, aiohttp.ClientResponseError when a retryable status persists and the
+        last connection error when those persist.
+        """
+        scheduler = self.scheduler
+        attempt = 0
+        while True:
+            await self._acquire_token(deadline)
+            await self._acquire_slot(deadline)
+
+            try:
+                scheduler.count("requests")
+                with metrics.timer("http.latency"):
+                    async with self.session.get(url, params=params, timeout=self._timeout(deadline)) as response:
+                        status = response.status
+                        data = await response.json(content_type=None) if status == 200 else None
+            except asyncio.CancelledError:
+                scheduler.concurrency.release()
+                # The response is thrown away, the request was sent for nothing
+                metrics.count("cards.wasted_requests")
+                raise
+            except self._retry_exceptions as e:
+                delay = scheduler.end_attempt(attempt, url, deadline, error=e)
+                if delay is None:
+                    raise
+            except BaseException:
+                scheduler.concurrency.release()
+                raise
+            else:
+                delay = scheduler.end_attempt(attempt, url, deadline, status, response)
+                if delay is None:
+                    if status in RETRY_STATUSES:
+                        raise self._aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=status,
+                            message=f"{status} from {url} after {attempt + 1} attempts")
+                    return status, data
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        await self.session.close()
+
+
+def _fetcher():
+    """Return the running event loop's fetcher, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        fetcher = _fetchers[loop] = AsyncFetcher(MAX_CONCURRENCY)
+    return fetcher
+
+
+async def close():
+    """Close the running event loop's HTTP session, call before the loop ends"""
+    fetcher = _fetchers.pop(asyncio.get_running_loop(), None)
+    if fetcher is not None:
+        await fetcher.close()
+
+
+async def fetch_card_details_async(card_id):
+    """Fetch card details from YGOProDeck API without blocking the event loop"""
+    return (await fetch_card_details_many_async([card_id], chunk_size=1))[card_id]
+
+
+async def fetch_card_details_many_async(card_ids, chunk_size=BATCH_CHUNK_SIZE, on_batch=None, deadline=None):
+    """Coroutine version of card_service.fetch_card_details_many, resolving through the same cache
+
+    Chunks are fetched concurrently, at most MAX_CONCURRENCY requests at a time, and cards come
+    back as the same records and placeholders as from the blocking version. Cards another caller,
+    thread or coroutine, is already fetching are waited for rather than requested again.
+
+    Cancelling the task, e.g. because the user opened another deck, cancels its outstanding
+    requests. Cards fetched up to then stay cached, the rest are left for the next load.
+    """
+    fetch = BulkFetch(card_ids, on_batch)
+
+    # The catalogue and the store are read on a worker thread, SQLite would block the loop
+    unresolved = fetch.unresolved()
+    if unresolved:
+        with metrics.timer("card_service.local_lookup"):
+            await asyncio.get_running_loop().run_in_executor(None, resolve_local, unresolved)
+    fetch.read_local()
+
+    chunks = fetch.claim(chunk_size)
+    tasks = []
+    try:
+        if chunks:
+            fetcher = _fetcher()
+            tasks = [asyncio.ensure_future(_fetch_card_chunk(fetcher, chunk, deadline)) for chunk in chunks]
+        for task in asyncio.as_completed(tasks):
+            fetch.add(await task)
+    finally:
+        for task in tasks:
+            task.cancel()
+        fetch.abandon(FetchCancelled("card fetch was cancelled"))
+
+    if fetch.waiting:
+        shared = dict(zip(fetch.waiting, await asyncio.gather(
+            *(_wait_for(card_id, future, deadline) for card_id, future in fetch.waiting.items()))))
+        orphaned = fetch.add_shared(shared)
+        if orphaned:
+            fetch.add(await fetch_card_details_many_async(orphaned, chunk_size, deadline=deadline))
+    return fetch.cards()
+
+
+async def _wait_for(card_id, future, deadline):
+    """Wait for a card someone else is fetching, giving up with a missing placeholder at the deadline
+
+    Returns None when the other fetch was cancelled before it got the card.
+    """
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    try:
+        # Shielded so a cancelled waiter does not cancel the fetch it shares
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+    except asyncio.TimeoutError:
+        return placeholder_card(card_id, missing=True)
+    except FetchCancelled:
+        return None
+    except Exception as e:
+        return placeholder_card(card_id, error=e)
+
+
+async def _fetch_card_chunk(fetcher, chunk, deadline=None):
+    """Fetch one chunk of passcodes with a single cardinfo.php request"""
+    try:
+        status, data = await fetcher.get_json(card_service.API_URL,
+                                              params={'id': ','.join(str(card_id) for card_id in chunk)},
+                                              deadline=deadline)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return settle_chunk(chunk, error=e)
+
+    # SQLite would block the loop, fetched cards are stored on a worker thread
+    cards = settle_chunk(chunk, status, data, store=False)
+    fetched = {card_id: card for card_id, card in cards.items() if not card.placeholder}
+    if fetched and card_service.card_store is not None:
+        await asyncio.get_running_loop().run_in_executor(None, store_cards, fetched)
+    return cards
+
+
+async def get_deck_stats_async(deck, deadline=None):
+    """Generate statistics for a deck, fetching its uncached cards without blocking the event loop"""
+    cards = await fetch_card_details_many_async(deck.all_ids().tolist(), deadline=deadline)
+    return get_deck_stats(deck, cards.__getitem__, None)
+
+
+def _background_loop():
+    """Return the background event loop, starting its thread on first use"""
+    global _loop
+
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='card-fetch-loop', daemon=True).start()
+                atexit.register(_stop_background_loop, loop)
+                _loop = loop
+    return _loop
+
+
+def _stop_background_loop(loop):
+    """Close the background loop's HTTP session and stop the loop"""
+    try:
+        asyncio.run_coroutine_threadsafe(close(), loop).result(timeout=5)
+    except Exception as e:
+        print(f"Error closing the card fetch session: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def submit(coroutine):
+    """Run a coroutine on the background event loop and return its concurrent.futures.Future
+
+    Cancelling the future cancels the coroutine.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop())
+
+
+def fetch_card_details_many_sync(card_ids, chunk_size=BATCH_CHUNK_SIZE, on_batch=None, deadline=None, cancel=None):
+    """Blocking wrapper of fetch_card_details_many_async for threads without an event loop
+
+    on_batch is called on the background event loop's thread, unless every card is cached.
+    Cancelling cancel, a card_service.CancelToken, cancels the fetch's outstanding requests and
+    raises FetchCancelled like card_service.fetch_card_details_many.
+    """
+    # Cached decks are answered on the calling thread, without the round trip to the loop. Only then
+    # are the lookups counted, otherwise the coroutine counts them
+    card_ids = list(dict.fromkeys(card_ids))
+    card_cache = card_service.card_cache
+    cards = card_cache.peek_many(card_ids)
+    if len(cards) == len(card_ids) and len(card_cache.get_many(card_ids)) == len(card_ids):
+        metrics.count("cards.from_cache", len(cards))
+        if on_batch is not None and cards:
+            on_batch(dict(cards))
+        return cards
+
+    future = submit(fetch_card_details_many_async(card_ids, chunk_size=chunk_size, on_batch=on_batch,
+                                                  deadline=deadline))
+    if cancel is not None:
+        cancel.on_cancel(future.cancel)
+    try:
+        return future.result()
+    except CancelledError:
+        raise FetchCancelled("card fetch was cancelled") from None
@@ -0,0 +1,135 @@
+import glob
+import importlib.util
+import json
+import os
+import re
+import threading
+
+from app.card_store import default_cache_dir
+
+# Tile width in pixels, the widest .card-container in the deck grid
+ATLAS_TILE_WIDTH = 120
+
+# Tiles per atlas row
+ATLAS_COLUMNS = 10
+
+# Number of deck atlases kept on disk, the least recently built are deleted first
+MAX_ATLASES = 200
+
+# Atlas paths served by the image server, e.g. /atlas/<deck content hash>.jpg
+ATLAS_PATH = re.compile(r"^/atlas/([0-9a-f]{32})\.jpg$")
+
+
+def atlas_supported():
+    """Whether Pillow, the optional dependency atlases are drawn with, is installed"""
+    return importlib.util.find_spec("PIL") is not None
+
+
+def default_atlas_dir():
+    """Return the directory deck atlases are stored in"""
+    return os.path.join(default_cache_dir(), "atlases")
+
+
+class AtlasStore:
+    """One thumbnail atlas per deck, drawn from cached card images and keyed by the deck's content hash
+
+    An atlas is a JPEG of equally sized tiles plus a JSON layout mapping card ids to tile indices.
+    """
+
+    def __init__(self, image_cache, directory=None, tile_width=ATLAS_TILE_WIDTH, columns=ATLAS_COLUMNS,
+                 max_atlases=MAX_ATLASES):
+        self.image_cache = image_cache
+        self.directory = directory or default_atlas_dir()
+        self.tile_width = tile_width
+        self.columns = columns
+        self.max_atlases = max_atlases
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def file(self, content_hash):
+        """Path of the atlas image of a deck"""
+        return os.path.join(self.directory, f"{content_hash}.jpg")
+
+    def get(self, content_hash):
+        """Return the layout of a deck's atlas, None if it has not been built"""
+        try:
+            with open(os.path.join(self.directory, f"{content_hash}.json"), encoding="utf-8") as f:
+                layout = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.file(content_hash)):
+            return None
+        layout["tiles"] = {int(card_id): index for card_id, index in layout["tiles"].items()}
+        return layout
+
+    def build(self, content_hash, image_paths):
+        """Draw the atlas of a deck from a dict of card id -> image cache path and return its layout
+
+        Cards whose image is not available get no tile. Returns None if no image is available.
+        """
+        layout = self.get(content_hash)
+        if layout is not None:
+            return layout
+
+        from PIL import Image
+
+        files = {}
+        for card_id, image_path in image_paths.items():
+            file_path = self.image_cache.get(image_path) if image_path else None
+            if file_path is not None:
+                files[card_id] = file_path
+        if not files:
+            return None
+
+        with self._lock:
+            tile_width = self.tile_width
+            tile_height = None
+            tiles = {}
+            columns = min(self.columns, len(files))
+            rows = -(-len(files) // columns)
+            atlas = None
+            for card_id, file_path in files.items():
+                try:
+                    with Image.open(file_path) as image:
+                        if tile_height is None:
+                            # Every tile takes the aspect ratio of the first image
+                            tile_height = round(tile_width * image.height / image.width)
+                            atlas = Image.new("RGB", (columns * tile_width, rows * tile_height))
+                        # Let the JPEG decoder downscale while decoding
+                        image.draft("RGB", (tile_width, tile_height))
+                        thumbnail = image.convert("RGB").resize((tile_width, tile_height), Image.LANCZOS)
+                except Exception as e:
+                    print(f"Error adding {file_path} to the deck atlas: {e}")
+                    continue
+
+                index = len(tiles)
+                atlas.paste(thumbnail, ((index % columns) * tile_width, (index // columns) * tile_height))
+                tiles[card_id] = index
+
+            if not tiles:
+                return None
+
+            layout = {"path": f"/atlas/{content_hash}.jpg", "columns": columns, "rows": rows,
+                      "tile": [tile_width, tile_height], "tiles": tiles}
+
+            # Write the image before the layout, get() only trusts atlases that have both
+            temp_path = self.file(content_hash) + ".tmp"
+            atlas.save(temp_path, "JPEG", quality=85, optimize=True)
+            os.replace(temp_path, self.file(content_hash))
+            layout_path = os.path.join(self.directory, f"{content_hash}.json")
+            with open(layout_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(layout, f)
+            os.replace(layout_path + ".tmp", layout_path)
+
+            self._prune()
+        return layout
+
+    def _prune(self):
+        """Delete the oldest atlases beyond max_atlases"""
+        layouts = sorted(glob.glob(os.path.join(self.directory, "*.json")), key=os.path.getmtime)
+        for layout_path in layouts[:max(0, len(layouts) - self.max_atlases)]:
+            for path in (layout_path, layout_path[:-len(".json")] + ".jpg"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app import card_service
+from app.deck_parser import parse_ydk_file
+
+# Number of files handed to a worker at a time
+CHUNK_SIZE = 64
+
+# Number of files parsed, fetched, analysed and written per step, bounding memory on large corpora
+BATCH_SIZE = 16 * CHUNK_SIZE
+
+
+def find_ydk_files(root):
+    """Return every .ydk file below root, sorted for reproducible output"""
+    paths = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(".ydk"):
+                paths.append(os.path.join(directory, filename))
+    return sorted(paths)
+
+
+def _parse_chunk(paths):
+    """Parse a chunk of YDK files, returns a (record, deck) pair per file with deck None when it fails"""
+    parsed = []
+    for path in paths:
+        try:
+            parsed.append(parse_ydk_file(path, verbose=False))
+        except Exception as e:
+            parsed.append(e)
+
+    results = []
+    for path, deck in zip(paths, parsed):
+        if isinstance(deck, Exception):
+            results.append(({"path": path, "error": str(deck)}, None))
+            continue
+        card_ids, card_counts = np.unique(np.concatenate([deck.main, deck.extra]), return_counts=True)
+        record = {
+            "path": path,
+            "main_deck": len(deck["main"]),
+            "extra_deck": len(deck["extra"]),
+            "side_deck": len(deck["side"]),
+            "cards": dict(zip(card_ids.tolist(), card_counts.tolist()))
+        }
+        results.append((record, deck))
+    return results
+
+
+def _stats_chunk(job):
+    """Compute the stats of a chunk of decks from the cards the parent fetched, returns one dict per deck"""
+    decks, cards = job
+    # One vectorised stats pass for the whole chunk, workers never go to the network
+    return card_service.get_deck_stats_many(decks, cards.__getitem__, prefetch_func=None)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class MetagameTally:
+    """Running usage counts of analysed deck records, so a summary needs no list of every record
+
+    Only decks with main or extra cards count, files that failed to parse or hold no cards are
+    counted as skipped.
+    """
+
+    def __init__(self):
+        self.decks = 0
+        self.skipped = 0
+        self.playing = Counter()
+        self.copies = Counter()
+
+    def add(self, record):
+        if "error" in record or not record["cards"]:
+            self.skipped += 1
+            return
+        self.decks += 1
+        for card_id, count in record["cards"].items():
+            self.playing[card_id] += 1
+            self.copies[card_id] += count
+
+    def summary(self, cards, top=50):
+        """Metagame statistics, with names and types looked up in cards, a dict of card id -> card"""
+        most_played = []
+        for card_id, deck_count in self.playing.most_common(top):
+            most_played.append({
+                "id": card_id,
+                "name": cards[card_id].name,
+                "usage_rate": deck_count / self.decks,
+                "average_copies": self.copies[card_id] / deck_count
+            })
+
+        # Types are counted over main and extra copies, like usage rates
+        card_types = Counter()
+        for card_id, count in self.copies.items():
+            card_types[cards[card_id].type] += count
+
+        total_cards = sum(card_types.values())
+        return {
+            "decks": self.decks,
+            "skipped": self.skipped,
+            "cards": most_played,
+            "type_distribution": {card_type: count / total_cards for card_type, count in card_types.most_common()}
+        }
+
+
+def summarise(records, cards, top=50):
+    """Aggregate metagame statistics over analysed deck records, cards holds every card they play"""
+    tally = MetagameTally()
+    for record in records:
+        tally.add(record)
+    return tally.summary(cards, top=top)
+
+
+def _analyse_batch(pool, paths, cards):
+    """Parse, fetch and analyse one batch of files, returns their records in path order
+
+    Cards not in cards yet are fetched once by this process and added to it.
+    """
+    parsed = [result for chunk in pool.map(_parse_chunk, _chunks(paths, CHUNK_SIZE)) for result in chunk]
+
+    decks = [deck for _, deck in parsed if deck is not None]
+    card_ids = np.unique(np.concatenate([deck.all_ids() for deck in decks])).tolist() if decks else []
+    new_ids = [card_id for card_id in card_ids if card_id not in cards]
+    if new_ids:
+        cards.update(card_service.fetch_card_details_many(new_ids))
+
+    # Each worker gets its chunk's decks and only the cards they hold
+    stats_jobs = []
+    for chunk in _chunks(decks, CHUNK_SIZE):
+        chunk_ids = np.unique(np.concatenate([deck.all_ids() for deck in chunk])).tolist()
+        stats_jobs.append((chunk, {card_id: cards[card_id] for card_id in chunk_ids}))
+    all_stats = (stats for chunk_stats in pool.map(_stats_chunk, stats_jobs) for stats in chunk_stats)
+
+    records = []
+    for record, deck in parsed:
+        if deck is not None:
+            record["stats"] = next(all_stats)
+        records.append(record)
+    return records
+
+
+def run(root, out_path, jobs=None, catalogue_dir=None, store_path=None, summary_path=None, top=50):
+    """Analyse every YDK file below root, streaming records to out_path as JSONL
+
+    Files go through in batches of BATCH_SIZE: workers parse them, the parent fetches the cards it
+    has not seen yet under its single rate limit, then workers compute the stats from those cards
+    and the records are written.
+    """
+    paths = find_ydk_files(root)
+    analysed = 0
+    tally = MetagameTally()
+    cards = {}  # Every card seen so far, card id -> card
+    start = time.perf_counter()
+    card_service.open_card_sources(store_path, catalogue_dir)
+
+    with open(out_path, "w", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=jobs) as pool:
+        for batch in _chunks(paths, BATCH_SIZE):
+            for record in _analyse_batch(pool, batch, cards):
+                out.write(json.dumps(record) + "\n")
+                tally.add(record)
+                analysed += 1
+            out.flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"Analysed {analysed} decks in {elapsed:.2f}s ({analysed / elapsed if elapsed else 0:.0f} decks/s)",
+          file=sys.stderr)
+
+    summary = tally.summary(cards, top=top)
+    if summary_path:
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        print(json.dumps(summary, indent=2))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a directory tree of YDK files without the UI")
+    parser.add_argument("directory", help="directory to search for .ydk files")
+    parser.add_argument("--out", required=True, help="JSONL file receiving one stats record per deck")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--summary", help="write the metagame summary to this file instead of stdout")
+    parser.add_argument("--top", type=int, default=50, help="number of most played cards in the summary")
+    parser.add_argument("--catalogue", default=None,
+                        help="offline catalogue directory (default: the user cache catalogue when built)")
+    parser.add_argument("--store", default=None,
+                        help="card store path (default: the user cache store, '' to disable)")
+    args = parser.parse_args(argv)
+
+    run(args.directory, args.out, jobs=args.jobs, catalogue_dir=args.catalogue, store_path=args.store,
+        summary_path=args.summary, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Default budget and lifetimes of cached card records
+MAX_ENTRIES = 20000
+POSITIVE_TTL = None
+NEGATIVE_TTL = 300
+
+
+class CardCache:
+    """Thread-safe LRU cache of card records with separate TTLs for found and missing cards
+
+    Missing cards (placeholders for unknown ids or failed fetches) are stored as negative
+    entries so they are requested again at most once per negative_ttl seconds. A TTL of None
+    never expires.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # card_id -> (card, expires_at, negative), least recently used first
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, card_id, now):
+        """Return the live entry for card_id or None, the caller holds the lock"""
+        entry = self._entries.get(card_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._entries[card_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(card_id)
+        if entry[2]:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get(self, card_id, default=None):
+        """Return the cached card for card_id, or default when it is missing or expired"""
+        with self._lock:
+            entry = self._lookup(card_id, self._clock())
+        return default if entry is None else entry[0]
+
+    def get_many(self, card_ids):
+        """Return a dict of the cached cards among card_ids"""
+        cards = {}
+        with self._lock:
+            now = self._clock()
+            for card_id in card_ids:
+                entry = self._lookup(card_id, now)
+                if entry is not None:
+                    cards[card_id] = entry[0]
+        return cards
+
+    def _peek(self, card_id, now):
+        """Return the live entry for card_id or None without counting or reordering, the caller holds the lock"""
+        entry = self._entries.get(card_id)
+        if entry is None or (entry[1] is not None and entry[1] <= now):
+            return None
+        return entry
+
+    def peek(self, card_id, default=None):
+        """Like get, but leaves the counters and the LRU order alone, for re-checks of ids already looked up"""
+        with self._lock:
+            entry = self._peek(card_id, self._clock())
+        return default if entry is None else entry[0]
+
+    def peek_many(self, card_ids):
+        """Like get_many, but leaves the counters and the LRU order alone"""
+        cards = {}
+        with self._lock:
+            now = self._clock()
+            for card_id in card_ids:
+                entry = self._peek(card_id, now)
+                if entry is not None:
+                    cards[card_id] = entry[0]
+        return cards
+
+    def put(self, card_id, card, negative=False):
+        """Cache a card, negative entries use the negative TTL"""
+        self.update({card_id: card}, negative=negative)
+
+    def update(self, cards, negative=False):
+        """Cache a dict of card id -> card"""
+        ttl = self.negative_ttl if negative else self.positive_ttl
+        with self._lock:
+            expires_at = None if ttl is None else self._clock() + ttl
+            for card_id, card in cards.items():
+                self._entries[card_id] = (card, expires_at, negative)
+                self._entries.move_to_end(card_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, card_id):
+        with self._lock:
+            entry = self._entries.get(card_id)
+            return entry is not None and (entry[1] is None or entry[1] > self._clock())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the cache counters"""
+        with self._lock:
+            negative = sum(1 for entry in self._entries.values() if entry[2])
+            return {
+                "entries": len(self._entries),
+                "negative_entries": negative,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,97 @@
+import sys
+
+
+def _intern(value):
+    """Interned copy of a string so every card shares one instance, other values pass through"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class CardRecord:
+    """Immutable details of one card, shared by every deck and thread that looks the card up
+
+    Type, attribute and race strings are interned, so thousands of cached cards hold one copy of
+    "Effect Monster" or "DARK" between them. Per-deck data such as copy counts never goes into a
+    record, callers build their own dicts with to_dict().
+    """
+
+    __slots__ = ("name", "type", "desc", "image_url", "atk", "defense", "level", "attribute", "race", "missing")
+
+    # Set on PlaceholderRecord, the stand-in for a card that could not be fetched
+    placeholder = False
+
+    def __init__(self, name, type, desc="", image_url=None, atk=None, defense=None, level=None, attribute=None,
+                 race=None, missing=False):
+        set_field = object.__setattr__
+        set_field(self, "name", name)
+        set_field(self, "type", _intern(type))
+        set_field(self, "desc", desc)
+        set_field(self, "image_url", image_url)
+        set_field(self, "atk", atk)
+        set_field(self, "defense", defense)
+        set_field(self, "level", level)
+        set_field(self, "attribute", _intern(attribute))
+        set_field(self, "race", _intern(race))
+        set_field(self, "missing", missing)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CardRecord is immutable, cannot set {name!r}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"CardRecord is immutable, cannot delete {name!r}")
+
+    def __reduce__(self):
+        return CardRecord, self._fields()
+
+    def _fields(self):
+        return tuple(getattr(self, field) for field in CardRecord.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, CardRecord):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash(self._fields())
+
+    def __repr__(self):
+        return f"CardRecord(name={self.name!r}, type={self.type!r})"
+
+    def to_dict(self, **extra):
+        """The card as the dict sent to the page and stored on disk, plus any extra keys
+
+        Monster stats are only included for monsters and 'missing' only when it is set, the shape
+        cardinfo.php entries were always turned into.
+        """
+        if "Monster" in self.type:
+            card = {"name": self.name, "type": self.type, "desc": self.desc, "image_url": self.image_url,
+                    "atk": self.atk, "def": self.defense, "level": self.level, "attribute": self.attribute,
+                    "race": self.race}
+        else:
+            card = {"name": self.name, "type": self.type, "desc": self.desc, "image_url": self.image_url}
+        if self.missing:
+            card["missing"] = True
+        if extra:
+            card.update(extra)
+        return card
+
+    @classmethod
+    def from_dict(cls, card):
+        """Build a record from a dict in the to_dict() shape"""
+        return cls(card.get("name", "Unknown"), card.get("type", "Unknown"), card.get("desc", ""),
+                   card.get("image_url"), atk=card.get("atk"), defense=card.get("def"), level=card.get("level"),
+                   attribute=card.get("attribute"), race=card.get("race"), missing=card.get("missing", False))
+
+
+class PlaceholderRecord(CardRecord):
+    """Stand-in for a card that failed to fetch, was not found or did not load in time
+
+    Placeholders are only cached until the negative TTL expires and are never memoised with a deck
+    or written to the card store.
+    """
+
+    __slots__ = ()
+
+    placeholder = True
+
+    def __reduce__(self):
+        return PlaceholderRecord, self._fields()
@@ -1,116 +1,667 @@
-import requests
 from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+import os
+import threading
 import time
 
-# Cache API responses to avoid rate limiting
-card_api_cache = {}
+from app import metrics
+from app.card_cache import CardCache, MAX_ENTRIES, POSITIVE_TTL, NEGATIVE_TTL
+from app.card_record import CardRecord, PlaceholderRecord
+from app.card_store import CardStore
+from app.catalogue import Catalogue, default_catalogue_dir
+from app.fetch_scheduler import FetchScheduler, DeadlineExceeded, RATE_LIMIT, CONNECT_TIMEOUT, READ_TIMEOUT, MAX_RETRIES
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+requests = lazy_import("requests")
+
+API_URL = "https://db.ygoprodeck.com/api/v7/cardinfo.php"
+
+# Number of passcodes sent in a single bulk cardinfo.php request
+BATCH_CHUNK_SIZE = 50
+
+# Maximum number of card requests in flight at once
+MAX_WORKERS = 8
+
+# Keys of the histograms returned by get_deck_stats, in display order
+STAT_FIELDS = ('card_types', 'attributes', 'monster_types', 'levels')
+
+# Single cache of card records shared by every caller, negative entries hold placeholders
+card_cache = CardCache()
+
+# Optional persistent store behind card_cache, opened by open_card_store()
+card_store = None
+
+# Optional offline catalogue consulted before the store and the network, opened by open_catalogue()
+catalogue = None
+
+# Fetches in progress, card_id -> Future shared by every caller waiting for that card
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Shared keep-alive session, request scheduler and worker pool, created by configure_fetcher()
+# on the first card request
+session = None
+scheduler = None
+_executor = None
+_fetcher_lock = threading.Lock()
+
+
+class FetchCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Lets a caller stop a card fetch it no longer needs, e.g. the load of a deck the user moved on from
+
+    Chunks not yet requested are skipped and the fetch raises FetchCancelled, cards fetched by
+    then stay cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Call callback once the token is cancelled, right away if it already is"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+def configure_fetcher(max_workers=MAX_WORKERS, rate_limit=RATE_LIMIT, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                      max_retries=MAX_RETRIES):
+    """(Re)create the pooled HTTP session, the request scheduler and the worker pool used for card requests
+
+    max_workers sizes both the worker pool and the scheduler's concurrency limit, MAX_WORKERS is
+    only the default.
+    """
+    global session, scheduler, _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    scheduler = FetchScheduler(session, rate=rate_limit, max_concurrency=max_workers, timeout=timeout,
+                               max_retries=max_retries)
+    _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='card-fetch')
+
+
+def _fetcher():
+    """Return the request scheduler, configuring the fetcher with defaults on first use"""
+    if scheduler is None:
+        with _fetcher_lock:
+            if scheduler is None:
+                configure_fetcher()
+    return scheduler
+
+
+def configure_cache(max_entries=MAX_ENTRIES, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+    """Replace the shared card cache with an empty one using the given budget and TTLs"""
+    global card_cache
+
+    card_cache = CardCache(max_entries=max_entries, positive_ttl=positive_ttl, negative_ttl=negative_ttl)
+    return card_cache
+
+
+def open_card_store(path=None):
+    """Open the persistent store that card lookups read and write through"""
+    global card_store
+
+    if card_store is not None:
+        card_store.close()
+    card_store = CardStore(path)
+    return card_store
+
+
+def warm_start(card_ids=None):
+    """Load stored cards into the in-memory cache and return how many were loaded
+
+    Without card_ids the whole store is loaded.
+    """
+    if card_store is None:
+        return 0
+
+    if card_ids is None:
+        card_ids = card_store.all_ids()
+    cards = card_store.get_many([card_id for card_id in card_ids if card_id not in card_cache])
+    card_cache.update(cards)
+    return len(cards)
+
+
+def open_catalogue(directory):
+    """Open an offline card catalogue compiled with 'python -m app.catalogue build'"""
+    global catalogue
+
+    catalogue = Catalogue(directory)
+    return catalogue
+
+
+def open_card_sources(store_path=None, catalogue_dir=None):
+    """Open the persistent card store and the offline catalogue
+
+    A store_path of '' runs without a store. Without catalogue_dir the default catalogue is opened
+    when one has been built. Either failing is only reported, lookups then go to the network.
+    """
+    # Open the persistent card store so restarts don't refetch every card
+    if store_path != '':
+        try:
+            open_card_store(store_path)
+        except Exception as e:
+            print(f"Error opening card store, continuing without it: {e}")
+
+    # Resolve cards offline when a catalogue has been built
+    if catalogue_dir is None and os.path.isdir(default_catalogue_dir()):
+        catalogue_dir = default_catalogue_dir()
+    if catalogue_dir:
+        try:
+            open_catalogue(catalogue_dir)
+        except Exception as e:
+            print(f"Error opening card catalogue, continuing without it: {e}")
+
+
+def resolve_local(card_ids):
+    """Fill the in-memory cache from the catalogue and the persistent store"""
+    if catalogue is not None:
+        card_cache.update(catalogue.get_cards([card_id for card_id in card_ids if card_id not in card_cache]))
+    warm_start(card_ids)
+
+
+def store_cards(cards):
+    """Write freshly fetched cards through to the persistent store"""
+    if card_store is None or not cards:
+        return
+    try:
+        card_store.put_many(cards)
+    except Exception as e:
+        print(f"Error writing cards to the card store: {e}")
+
+
+def claim_cards(card_ids):
+    """Split uncached card_ids into the ones this caller must fetch and the ones already being fetched
+
+    Returns two dicts of card_id -> Future. The caller must settle every owned future with
+    settle_chunk() or abandon_cards(), other callers wait on it instead of sending their own request.
+    """
+    owned, waiting = {}, {}
+    with _inflight_lock:
+        for card_id in card_ids:
+            future = _inflight.get(card_id)
+            if future is None:
+                owned[card_id] = _inflight[card_id] = Future()
+            else:
+                waiting[card_id] = future
+
+    # A fetch may have completed between the cache lookup and the claim
+    _settle(card_cache.peek_many(list(owned)))
+    return {card_id: future for card_id, future in owned.items() if not future.done()}, waiting
+
+
+def _settle(cards):
+    """Hand fetched cards to everyone waiting on them and end their in-flight entries"""
+    with _inflight_lock:
+        settled = [(_inflight.pop(card_id, None), card) for card_id, card in cards.items()]
+    for future, card in settled:
+        if future is not None and not future.done():
+            future.set_result(card)
+
+
+def abandon_cards(card_ids, error, owned=None):
+    """Fail the in-flight entries of card_ids that were never settled
+
+    Given owned, the futures claim_cards() returned, entries another caller has claimed since are left
+    alone, such as the refetch of a card whose fetch was cancelled.
+    """
+    with _inflight_lock:
+        abandoned = [_inflight.pop(card_id) for card_id in card_ids
+                     if card_id in _inflight and (owned is None or _inflight[card_id] is owned[card_id])]
+    for future in abandoned:
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+
+def _build_card(card_data):
+    """Create a CardRecord from a cardinfo.php entry"""
+    image_url = None
+    if 'card_images' in card_data and len(card_data['card_images']) > 0:
+        if 'image_url_cropped' in card_data['card_images'][0]:
+            image_url = card_data['card_images'][0]['image_url_cropped']
+        elif 'image_url' in card_data['card_images'][0]:
+            image_url = card_data['card_images'][0]['image_url']
+
+    name = card_data.get('name', 'Unknown')
+    card_type = card_data.get('type', 'Unknown')
+    desc = card_data.get('desc', '')
+
+    # Add monster-specific attributes if applicable
+    if 'Monster' in card_data.get('type', ''):
+        return CardRecord(name, card_type, desc, image_url,
+                          atk=card_data.get('atk', 0),
+                          defense=card_data.get('def', 0) if 'def' in card_data else None,
+                          level=card_data.get('level', None) or card_data.get('rank', None) or card_data.get(
+                              'linkval', None),
+                          attribute=card_data.get('attribute', ''),
+                          race=card_data.get('race', ''))
+
+    return CardRecord(name, card_type, desc, image_url)
+
+
+def _card_passcodes(card_data):
+    """Return every passcode a cardinfo.php entry answers to (including alternate artworks)"""
+    passcodes = {card_data.get('id')}
+    for image in card_data.get('card_images', []):
+        passcodes.add(image.get('id'))
+    passcodes.discard(None)
+    return passcodes
+
+
+def placeholder_card(card_id, error=None, missing=False):
+    """Return a placeholder for a card that could not be fetched
+
+    Missing placeholders stand in for cards the deck load deadline cut off, they are never cached.
+    """
+    if missing:
+        return PlaceholderRecord(f'Card #{card_id}', 'Unknown', 'Card data did not load in time', missing=True)
+    if error is not None:
+        return PlaceholderRecord(f'Card #{card_id}', 'Error', f'Failed to fetch card data: {str(error)}')
+    return PlaceholderRecord(f'Card #{card_id}', 'Unknown', 'Card data not available')
 
 
 def fetch_card_details(card_id):
     """Fetch card details from YGOProDeck API"""
 
-    if card_id in card_api_cache:
-        return card_api_cache[card_id]
+    card = card_cache.get(card_id)
+    if card is not None:
+        metrics.count("cards.from_cache")
+        return card
+
+    # Read through the catalogue and the persistent store before going to the network
+    with metrics.timer("card_service.local_lookup"):
+        resolve_local([card_id])
+    card = card_cache.peek(card_id)
+    if card is not None:
+        metrics.count("cards.from_local")
+        return card
+
+    # Share the result of a fetch another thread already started
+    owned, waiting = claim_cards([card_id])
+    if card_id in waiting:
+        metrics.count("cards.shared")
+        try:
+            return waiting[card_id].result()
+        except FetchCancelled:
+            # Whoever was fetching it gave up, fetch it here instead
+            return fetch_card_details(card_id)
+    if card_id not in owned:
+        return card_cache.peek(card_id, placeholder_card(card_id))
+
+    metrics.count("cards.fetched")
+    try:
+        card = _fetch_card(card_id)
+    except BaseException as e:
+        abandon_cards([card_id], e, owned)
+        raise
+    _settle({card_id: card})
+    return card
+
 
+def _fetch_card(card_id):
+    """Fetch a single card from the API and cache the result"""
     try:
-        api_url = f"https://db.ygoprodeck.com/api/v7/cardinfo.php?id={card_id}"
-        response = requests.get(api_url)
+        response = _fetcher().get(API_URL, params={'id': card_id})
 
         if response.status_code == 200:
             data = response.json()
 
             if 'data' in data and len(data['data']) > 0:
-                card_data = data['data'][0]
-
-                image_url = None
-                if 'card_images' in card_data and len(card_data['card_images']) > 0:
-                    if 'image_url_cropped' in card_data['card_images'][0]:
-                        image_url = card_data['card_images'][0]['image_url_cropped']
-                    elif 'image_url' in card_data['card_images'][0]:
-                        image_url = card_data['card_images'][0]['image_url']
-
-                # Create a simplified card object
-                card = {
-                    'name': card_data.get('name', 'Unknown'),
-                    'type': card_data.get('type', 'Unknown'),
-                    'desc': card_data.get('desc', ''),
-                    'image_url': image_url
-                }
-
-                # Add monster-specific attributes if applicable
-                if 'Monster' in card_data.get('type', ''):
-                    card['atk'] = card_data.get('atk', 0)
-                    card['def'] = card_data.get('def', 0) if 'def' in card_data else None
-                    card['level'] = card_data.get('level', None) or card_data.get('rank', None) or card_data.get(
-                        'linkval', None)
-                    card['attribute'] = card_data.get('attribute', '')
-                    card['race'] = card_data.get('race', '')
+                card = _build_card(data['data'][0])
 
                 # Cache the result
-                card_api_cache[card_id] = card
+                card_cache.put(card_id, card)
+                store_cards({card_id: card})
                 return card
 
-        # Return a placeholder if API fails or card not found
-        return {
-            'name': f'Card #{card_id}',
-            'type': 'Unknown',
-            'desc': 'Card data not available',
-            'image_url': None
-        }
+        # Return a placeholder if API fails or card not found, cached until the negative TTL expires
+        card = placeholder_card(card_id)
 
     except Exception as e:
         print(f"Error fetching card {card_id}: {e}")
         # Return a placeholder for error
-        return {
-            'name': f'Card #{card_id}',
-            'type': 'Error',
-            'desc': f'Failed to fetch card data: {str(e)}',
-            'image_url': None
-        }
+        card = placeholder_card(card_id, error=e)
+
+    card_cache.put(card_id, card, negative=True)
+    return card
+
+
+class BulkFetch:
+    """Bookkeeping of one bulk card fetch, shared by fetch_card_details_many and its asyncio version
+
+    Tracks which cards are resolved, claims the missing ones, hands resolved cards to on_batch and
+    assembles the result in request order. Sending the chunks and waiting for cards someone else
+    is fetching are left to the caller's transport.
+    """
+
+    def __init__(self, card_ids, on_batch=None):
+        self.card_ids = list(dict.fromkeys(card_ids))
+        self.on_batch = on_batch
+        self.results = card_cache.get_many(self.card_ids)
+        self.owned = {}
+        self.waiting = {}
+        self._cached = len(self.results)
+
+    def unresolved(self):
+        """The requested cards not resolved yet, in request order"""
+        return [card_id for card_id in self.card_ids if card_id not in self.results]
 
+    def read_local(self):
+        """Take the cards resolve_local() put in the cache, then hand everything resolved so far to on_batch"""
+        if self._cached < len(self.card_ids):
+            self.results.update(card_cache.peek_many(self.unresolved()))
+        metrics.count("cards.from_cache", self._cached)
+        metrics.count("cards.from_local", len(self.results) - self._cached)
+        if self.on_batch is not None and self.results:
+            self.on_batch(dict(self.results))
+
+    def claim(self, chunk_size):
+        """Claim the unresolved cards nobody else is fetching, returns them split in chunks of chunk_size
+
+        Cards already being fetched end up in waiting, the caller waits for them once its own
+        chunks are done. Every owned card must be settled or abandoned.
+        """
+        missing = self.unresolved()
+        self.owned, self.waiting = claim_cards(missing)
+        settled = [card_id for card_id in missing if card_id not in self.owned and card_id not in self.waiting]
+        if settled:
+            self.results.update(card_cache.peek_many(settled))
+
+        owned_ids = list(self.owned)
+        metrics.count("cards.fetched", len(owned_ids))
+        metrics.count("cards.shared", len(self.waiting))
+        return [owned_ids[start:start + chunk_size] for start in range(0, len(owned_ids), chunk_size)]
+
+    def add(self, cards):
+        """Record resolved cards and hand them to on_batch"""
+        self.results.update(cards)
+        if self.on_batch is not None and cards:
+            self.on_batch(cards)
+
+    def abandon(self, error):
+        """Fail the claimed cards left unfetched, whoever waits on them fetches them instead"""
+        abandon_cards(list(self.owned), error, self.owned)
+
+    def add_shared(self, shared):
+        """Record the cards waited for, returns the ids whose fetch its owner cancelled (None in shared)
+
+        The caller fetches those itself and records them with add().
+        """
+        orphaned = [card_id for card_id, card in shared.items() if card is None]
+        self.add({card_id: card for card_id, card in shared.items() if card is not None})
+        return orphaned
+
+    def cards(self):
+        """Every requested card, in the order the ids were requested"""
+        return {card_id: self.results[card_id] for card_id in self.card_ids}
+
+
+def fetch_card_details_many(card_ids, chunk_size=BATCH_CHUNK_SIZE, on_batch=None, deadline=None, cancel=None):
+    """Fetch details for many cards, resolving cache misses in chunked bulk requests
+
+    Chunks are fetched in parallel on the shared worker pool, at most configure_fetcher()'s
+    max_workers in flight, and the result preserves the order of card_ids. A chunk_size of 1
+    fans out one request per card. When given, on_batch is called with a dict of cards as soon as they are resolved:
+    once for the cards found locally, then once per fetched chunk in completion order.
+
+    deadline is an absolute time.monotonic() value. Cards not resolved by then come back as
+    placeholders with 'missing' set, so a slow or throttled API cannot stall a deck load.
+
+    Once cancel, a CancelToken, is cancelled no further chunks are requested and FetchCancelled
+    is raised. Requests already sent complete and their cards are cached.
+    """
+    fetch = BulkFetch(card_ids, on_batch)
+
+    # Read through the catalogue and the persistent store before going to the network
+    unresolved = fetch.unresolved()
+    if unresolved:
+        with metrics.timer("card_service.local_lookup"):
+            resolve_local(unresolved)
+    fetch.read_local()
+
+    chunks = fetch.claim(chunk_size)
+    if chunks:
+        _fetcher()
+    try:
+        if len(chunks) == 1:
+            fetch.add(_fetch_card_chunk(chunks[0], deadline, cancel))
+        else:
+            futures = [_executor.submit(_fetch_card_chunk, chunk, deadline, cancel) for chunk in chunks]
+            for future in as_completed(futures):
+                fetch.add(future.result())
+    finally:
+        fetch.abandon(RuntimeError("card fetch was abandoned"))
+    if cancel is not None and cancel.cancelled:
+        raise FetchCancelled("card fetch was cancelled")
 
-def get_deck_stats(deck, get_card_details_func):
-    """Generate statistics for a deck"""
-    stats = {}
+    shared = {card_id: _wait_for(card_id, future, deadline) for card_id, future in fetch.waiting.items()}
+    orphaned = fetch.add_shared(shared)
+    if orphaned:
+        fetch.add(fetch_card_details_many(orphaned, chunk_size, deadline=deadline, cancel=cancel))
+    return fetch.cards()
 
-    # Count card types, attributes, etc.
-    card_types = Counter()
-    attributes = Counter()
-    monster_types = Counter()
-    levels = Counter()
 
-    # Process each section
+def _wait_for(card_id, future, deadline):
+    """Wait for a card another thread is fetching, giving up with a missing placeholder at the deadline
+
+    Returns None when the other fetch was cancelled before it got the card.
+    """
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        return placeholder_card(card_id, missing=True)
+    except FetchCancelled:
+        return None
+    except Exception as e:
+        return placeholder_card(card_id, error=e)
+
+
+def _fetch_card_chunk(chunk, deadline=None, cancel=None):
+    """Fetch one chunk of passcodes with a single cardinfo.php request
+
+    A chunk whose fetch was cancelled before its request went out is skipped and returns no cards.
+    """
+    if cancel is not None and cancel.cancelled:
+        metrics.count("cards.skipped_requests")
+        abandon_cards(chunk, FetchCancelled("card fetch was cancelled"))
+        return {}
+
+    try:
+        response = _fetcher().get(API_URL, params={'id': ','.join(str(card_id) for card_id in chunk)},
+                                 deadline=deadline)
+        if cancel is not None and cancel.cancelled:
+            # Sent for a load nobody is waiting for any more, only the cache gets its cards
+            metrics.count("cards.wasted_requests")
+        data = response.json() if response.status_code == 200 else None
+    except Exception as e:
+        return settle_chunk(chunk, error=e)
+    return settle_chunk(chunk, response.status_code, data)
+
+
+def settle_chunk(chunk, status=None, data=None, error=None, store=True):
+    """Turn the answer to one cardinfo.php request for chunk into cards, cache them and hand them to waiters
+
+    Shared by every transport. status and data are the response status and decoded body, error
+    the exception that ended the request instead. Cards missing from the answer become
+    placeholders, cards cut off by a DeadlineExceeded are left uncached. Without store the
+    fetched cards are not written to the card store, e.g. for an event loop that writes them with
+    store_cards() on a worker thread. Returns the cards of the chunk.
+    """
+    if isinstance(error, DeadlineExceeded):
+        # Leave these uncached so the next load asks for them again
+        cards = {card_id: placeholder_card(card_id, missing=True) for card_id in chunk}
+        metrics.count("cards.missing", len(chunk))
+        _settle(cards)
+        return cards
+
+    fetched = {}
+    # The API answers 400 when none of the requested ids exist
+    if error is None and status == 200:
+        try:
+            found = {}
+            with metrics.timer("card_service.parse_response"):
+                for card_data in data.get('data', []):
+                    card = _build_card(card_data)
+                    for passcode in _card_passcodes(card_data):
+                        found[passcode] = card
+            fetched = {card_id: found[card_id] for card_id in chunk if card_id in found}
+        except Exception as e:
+            error = e
+    if error is not None:
+        print(f"Error fetching cards {chunk}: {error}")
+        metrics.count("cards.errors", len(chunk))
+
+    # Cards missing from the response become placeholders instead of extra requests
+    placeholders = {card_id: placeholder_card(card_id, error=error) for card_id in chunk if card_id not in fetched}
+    card_cache.update(fetched)
+    card_cache.update(placeholders, negative=True)
+    if store:
+        store_cards(fetched)
+
+    cards = {card_id: fetched[card_id] if card_id in fetched else placeholders[card_id] for card_id in chunk}
+    _settle(cards)
+    return cards
+
+
+def _card_feature_codes(card_ids, order, get_card_details_func):
+    """Map passcodes to integer codes for every stat field
+
+    Returns a (field, card) code matrix aligned with card_ids and one vocabulary per field that
+    turns codes back into values. Code 0 means the card is not counted for that field. Cards are
+    visited in the given order so codes, and the histograms built from them, come out in
+    first-seen order like a Counter.
+    """
+    vocabularies = [[None] for _ in STAT_FIELDS]
+    value_codes = [{} for _ in STAT_FIELDS]
+    codes = [[0] * len(card_ids) for _ in STAT_FIELDS]
+
+    card_ids = card_ids.tolist()
+    for index in order.tolist():
+        card = get_card_details_func(card_ids[index])
+        values = [card.type]
+
+        # Other stats are only counted for monsters
+        if 'Monster' in card.type:
+            values += [card.attribute, card.race, card.level]
+
+        for field, value in enumerate(values):
+            if not value:
+                continue
+            code = value_codes[field].get(value)
+            if code is None:
+                code = value_codes[field][value] = len(vocabularies[field])
+                vocabularies[field].append(value)
+            codes[field][index] = code
+
+    codes = np.array(codes, dtype=np.intp)
+    return codes, vocabularies
+
+
+def get_deck_stats(deck, get_card_details_func, prefetch_func=fetch_card_details_many):
+    """Generate statistics for a deck
+
+    One deck is counted with Counters over its unique cards, at this size that beats the numpy
+    set-up of get_deck_stats_many.
+    """
+    card_ids = []
     for section in ["main", "extra", "side"]:
-        for card_id in deck[section]:
-            # Get card details
-            card = get_card_details_func(card_id)
+        cards = deck[section]
+        card_ids += cards.tolist() if hasattr(cards, 'tolist') else cards
+
+    # Fetch all missing cards in parallel before counting
+    if prefetch_func is not None and card_ids:
+        prefetch_func(card_ids)
+
+    # Visiting cards in first-seen order keeps the values of each histogram in first-seen order
+    histograms = [Counter() for _ in STAT_FIELDS]
+    for card_id, copies in Counter(card_ids).items():
+        card = get_card_details_func(card_id)
+        values = [card.type]
+
+        # Other stats are only counted for monsters
+        if 'Monster' in card.type:
+            values += [card.attribute, card.race, card.level]
+
+        for histogram, value in zip(histograms, values):
+            if value:
+                histogram[value] += copies
+
+    return {field: dict(histogram) for field, histogram in zip(STAT_FIELDS, histograms) if histogram}
+
 
-            # Count card type
-            if card.get('type'):
-                card_types[card['type']] += 1
+def get_deck_stats_many(decks, get_card_details_func, prefetch_func=fetch_card_details_many):
+    """Generate statistics for many decks at once, returns one stats dict per deck
 
-            # Count other stats for monsters
-            if 'Monster' in card.get('type', ''):
-                if card.get('attribute'):
-                    attributes[card['attribute']] += 1
+    Every copy of every deck is mapped to integer feature codes and all histograms are counted
+    with a single bincount, so the Python work is per unique card rather than per copy.
+    """
+    sections = ["main", "extra", "side"]
+    arrays = [np.asarray(deck[section], dtype=np.uint32) for deck in decks for section in sections]
+    all_ids = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.uint32)
+    stats = [{} for _ in decks]
+    if len(all_ids) == 0:
+        return stats
 
-                if card.get('race'):
-                    monster_types[card['race']] += 1
+    # Fetch all missing cards in parallel before counting
+    if prefetch_func is not None:
+        prefetch_func(all_ids.tolist())
 
-                if card.get('level'):
-                    levels[card['level']] += 1
+    deck_lengths = np.add.reduceat([len(array) for array in arrays], np.arange(0, len(arrays), len(sections)))
+    deck_index = np.repeat(np.arange(len(decks)), deck_lengths)
 
-    # Add stats to the result
-    if card_types:
-        stats['card_types'] = dict(card_types)
+    # Look every unique card up once, in the order it first appears
+    unique_ids, first_index, inverse = np.unique(all_ids, return_index=True, return_inverse=True)
+    codes, vocabularies = _card_feature_codes(unique_ids, np.argsort(first_index), get_card_details_func)
 
-    if attributes:
-        stats['attributes'] = dict(attributes)
+    # Shift each field into its own code range so one bincount covers every field and deck
+    offsets = np.cumsum([0] + [len(vocabulary) for vocabulary in vocabularies])
+    width = int(offsets[-1])
+    code_fields = [STAT_FIELDS[field] for field, vocabulary in enumerate(vocabularies) for _ in vocabulary]
+    code_values = [value for vocabulary in vocabularies for value in vocabulary]
 
-    if monster_types:
-        stats['monster_types'] = dict(monster_types)
+    copy_codes = codes[:, inverse]
+    fields, positions = copy_codes.nonzero()
+    pairs = deck_index[positions] * width + (copy_codes[fields, positions] + offsets[fields])
+    histogram = np.bincount(pairs, minlength=len(decks) * width)
 
-    if levels:
-        stats['levels'] = dict(levels)
+    # Emit values in the order they were first seen in each deck, like a Counter would
+    present, first_seen = np.unique(pairs, return_index=True)
+    present = present[np.argsort(positions[first_seen], kind="stable")]
+    present_decks = (present // width).tolist()
+    present_codes = (present % width).tolist()
+    for deck, code, count in zip(present_decks, present_codes, histogram[present].tolist()):
+        deck_stats = stats[deck]
+        field = code_fields[code]
+        if field in deck_stats:
+            deck_stats[field][code_values[code]] = count
+        else:
+            deck_stats[field] = {code_values[code]: count}
 
-    return stats
\ No newline at end of file
+    return [{field: deck_stats[field] for field in STAT_FIELDS if field in deck_stats} for deck_stats in stats]
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from app.card_record import CardRecord
+
+# Bump when the layout of stored card records changes; older stores are wiped on open
+SCHEMA_VERSION = 1
+
+DB_FILENAME = "cards.sqlite3"
+
+
+def default_cache_dir():
+    """Return the per-user cache directory of the application"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+    return os.path.join(base, "YGOdeckViewer")
+
+
+class CardStore:
+    """Persistent SQLite store of card records keyed by passcode"""
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(default_cache_dir(), DB_FILENAME)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        # Card fetches write from worker threads (serialised by self._lock) and batch worker processes
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None or int(row[0]) != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS cards")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                                   (str(SCHEMA_VERSION),))
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                "id INTEGER PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def get_many(self, card_ids):
+        """Return a dict of the stored records for the given passcodes"""
+        card_ids = [int(card_id) for card_id in card_ids]
+        cards = {}
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(card_ids), 500):
+                chunk = card_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT id, data FROM cards WHERE id IN ({placeholders})", chunk)
+                for card_id, data in rows:
+                    cards[card_id] = CardRecord.from_dict(json.loads(data))
+        return cards
+
+    def put_many(self, cards):
+        """Insert or replace records from a dict of passcode -> card"""
+        if not cards:
+            return
+        fetched_at = time.time()
+        rows = [(int(card_id), json.dumps(card.to_dict()), fetched_at) for card_id, card in cards.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO cards (id, data, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def all_ids(self):
+        """Return the passcodes of every stored card"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM cards")]
+
+    def info(self):
+        """Return a summary of the store"""
+        with self._lock:
+            count, oldest, newest = self._conn.execute(
+                "SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM cards").fetchone()
+        return {
+            "path": self.path,
+            "schema_version": SCHEMA_VERSION,
+            "cards": count,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "oldest_fetch": oldest,
+            "newest_fetch": newest
+        }
+
+    def vacuum(self):
+        """Reclaim unused space in the database file"""
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def clear(self):
+        """Delete every stored card"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and maintain the persistent card store")
+    parser.add_argument("command", choices=["info", "vacuum", "clear"])
+    parser.add_argument("--path", help="path of the store (defaults to the user cache directory)")
+    args = parser.parse_args(argv)
+
+    store = CardStore(args.path)
+    try:
+        if args.command == "vacuum":
+            store.vacuum()
+        elif args.command == "clear":
+            store.clear()
+            store.vacuum()
+        print(json.dumps(store.info(), indent=2))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+
+from app.card_record import CardRecord
+from app.card_store import default_cache_dir
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Bump when the on-disk layout changes
+CATALOGUE_VERSION = 1
+
+META_FILENAME = "catalogue.json"
+HEAP_FILENAME = "strings.bin"
+COLUMNS = ("passcodes", "rows", "type", "attribute", "race", "level", "atk", "def", "image_id",
+           "name_offset", "name_length", "desc_offset", "desc_length")
+
+# Marks a missing ATK/DEF (e.g. DEF of Link monsters)
+NO_STAT = -2 ** 31  # int32 minimum
+
+IMAGE_URL_CROPPED = "https://images.ygoprodeck.com/images/cards_cropped/{}.jpg"
+
+
+class CatalogueException(Exception):
+    pass
+
+
+def default_catalogue_dir():
+    """Return the catalogue directory the application opens on startup when it exists"""
+    return os.path.join(default_cache_dir(), "catalogue")
+
+
+def _intern_code(vocabulary, codes, value):
+    """Return the integer code of value, adding it to the vocabulary if needed"""
+    if value not in codes:
+        codes[value] = len(vocabulary)
+        vocabulary.append(value)
+    return codes[value]
+
+
+def compile_catalogue(dump_path, out_dir):
+    """Compile a full cardinfo.php JSON dump into an on-disk catalogue and return the card count"""
+    with open(dump_path, "r", encoding="utf-8") as f:
+        cards = json.load(f).get("data", [])
+
+    # Code 0 is reserved for "none" in every vocabulary
+    vocabularies = {"type": [""], "attribute": [""], "race": [""]}
+    vocabulary_codes = {name: {"": 0} for name in vocabularies}
+    columns = {name: [] for name in COLUMNS if name not in ("passcodes", "rows")}
+    passcodes, rows = [], []
+    heap = bytearray()
+
+    for row, card in enumerate(cards):
+        card_type = card.get("type", "Unknown")
+        is_monster = "Monster" in card_type
+        images = card.get("card_images", [])
+
+        columns["type"].append(_intern_code(vocabularies["type"], vocabulary_codes["type"], card_type))
+        columns["attribute"].append(_intern_code(vocabularies["attribute"], vocabulary_codes["attribute"],
+                                                 card.get("attribute", "") if is_monster else ""))
+        columns["race"].append(_intern_code(vocabularies["race"], vocabulary_codes["race"],
+                                            card.get("race", "") if is_monster else ""))
+        columns["level"].append((card.get("level") or card.get("rank") or card.get("linkval") or 0)
+                                if is_monster else 0)
+        columns["atk"].append(card.get("atk", 0) if is_monster else NO_STAT)
+        columns["def"].append(card["def"] if is_monster and "def" in card else NO_STAT)
+        columns["image_id"].append(images[0]["id"] if images else 0)
+
+        for field in ("name", "desc"):
+            encoded = card.get(field, "Unknown" if field == "name" else "").encode("utf-8")
+            columns[f"{field}_offset"].append(len(heap))
+            columns[f"{field}_length"].append(len(encoded))
+            heap += encoded
+
+        # Alternate artworks share the row of their card
+        for passcode in {card["id"], *(image["id"] for image in images)}:
+            passcodes.append(passcode)
+            rows.append(row)
+
+    order = np.argsort(np.asarray(passcodes, dtype=np.uint32), kind="stable")
+    arrays = {
+        "passcodes": np.asarray(passcodes, dtype=np.uint32)[order],
+        "rows": np.asarray(rows, dtype=np.uint32)[order],
+        "type": np.asarray(columns["type"], dtype=np.uint16),
+        "attribute": np.asarray(columns["attribute"], dtype=np.uint8),
+        "race": np.asarray(columns["race"], dtype=np.uint16),
+        "level": np.asarray(columns["level"], dtype=np.uint8),
+        "atk": np.asarray(columns["atk"], dtype=np.int32),
+        "def": np.asarray(columns["def"], dtype=np.int32),
+        "image_id": np.asarray(columns["image_id"], dtype=np.uint32),
+    }
+    for field in ("name", "desc"):
+        arrays[f"{field}_offset"] = np.asarray(columns[f"{field}_offset"], dtype=np.uint32)
+        arrays[f"{field}_length"] = np.asarray(columns[f"{field}_length"], dtype=np.uint32)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+    with open(os.path.join(out_dir, HEAP_FILENAME), "wb") as f:
+        f.write(heap)
+    with open(os.path.join(out_dir, META_FILENAME), "w", encoding="utf-8") as f:
+        json.dump({"version": CATALOGUE_VERSION, "cards": len(cards), "vocabularies": vocabularies}, f)
+
+    return len(cards)
+
+
+class Catalogue:
+    """Read-only, memory-mapped card catalogue compiled by compile_catalogue()"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILENAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != CATALOGUE_VERSION:
+            raise CatalogueException(f"Unsupported catalogue version {meta.get('version')}, rebuild it")
+
+        self.directory = directory
+        self.vocabularies = meta["vocabularies"]
+        # Pages are only read from disk when a lookup touches them
+        self.columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+        heap_path = os.path.join(directory, HEAP_FILENAME)
+        self.heap = np.memmap(heap_path, dtype=np.uint8, mode="r") if os.path.getsize(heap_path) else b""
+
+    def __len__(self):
+        return len(self.columns["type"])
+
+    def lookup(self, card_ids):
+        """Return the row of every passcode in card_ids, -1 where it is not in the catalogue"""
+        passcodes = self.columns["passcodes"]
+        card_ids = np.asarray(card_ids, dtype=np.uint32)
+        if len(passcodes) == 0:
+            return np.full(len(card_ids), -1, dtype=np.int64)
+
+        positions = np.searchsorted(passcodes, card_ids)
+        positions = np.minimum(positions, len(passcodes) - 1)
+        found = passcodes[positions] == card_ids
+        return np.where(found, self.columns["rows"][positions].astype(np.int64), -1)
+
+    def _string(self, field, row):
+        offset = int(self.columns[f"{field}_offset"][row])
+        length = int(self.columns[f"{field}_length"][row])
+        return bytes(self.heap[offset:offset + length]).decode("utf-8")
+
+    def card(self, row):
+        """Build a card record for a catalogue row, in the shape fetch_card_details returns"""
+        columns = self.columns
+        card_type = self.vocabularies["type"][columns["type"][row]]
+        image_id = int(columns["image_id"][row])
+
+        name = self._string("name", row)
+        desc = self._string("desc", row)
+        image_url = IMAGE_URL_CROPPED.format(image_id) if image_id else None
+
+        if "Monster" in card_type:
+            atk, def_ = int(columns["atk"][row]), int(columns["def"][row])
+            return CardRecord(name, card_type, desc, image_url,
+                              atk=atk if atk != NO_STAT else 0,
+                              defense=def_ if def_ != NO_STAT else None,
+                              level=int(columns["level"][row]) or None,
+                              attribute=self.vocabularies["attribute"][columns["attribute"][row]],
+                              race=self.vocabularies["race"][columns["race"][row]])
+
+        return CardRecord(name, card_type, desc, image_url)
+
+    def get_cards(self, card_ids):
+        """Resolve many passcodes in one vectorised lookup, returns a dict of the ones found"""
+        card_ids = list(dict.fromkeys(card_ids))
+        rows = self.lookup(card_ids)
+        return {card_id: self.card(int(row)) for card_id, row in zip(card_ids, rows) if row >= 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query an offline card catalogue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="compile a cardinfo.php JSON dump")
+    build.add_argument("dump", help="path of the cardinfo.php JSON dump")
+    build.add_argument("out_dir", nargs="?", default=None,
+                       help="directory to write the catalogue to (defaults to the user cache directory)")
+
+    lookup = subparsers.add_parser("lookup", help="print the records of some passcodes")
+    lookup.add_argument("directory", help="catalogue directory")
+    lookup.add_argument("passcodes", nargs="+", type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        out_dir = args.out_dir or default_catalogue_dir()
+        count = compile_catalogue(args.dump, out_dir)
+        print(f"Compiled {count} cards into {out_dir}")
+    else:
+        catalogue = Catalogue(args.directory)
+        cards = catalogue.get_cards(args.passcodes)
+        print(json.dumps({card_id: card.to_dict() for card_id, card in cards.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
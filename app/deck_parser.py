@@ -1,18 +1,117 @@
 import base64
+import codecs
+import hashlib
+import re
 import zlib
-import struct
-import numpy as np
+
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+SECTIONS = ("main", "extra", "side")
+
+# Passcode lines of a YDK file, matched as whole lines so comments and junk lines are skipped
+YDK_CARD = re.compile(rb"^[ \t]*(\d{1,10})[ \t]*$", re.MULTILINE)
+YDK_LINE_CHARACTERS = b"0123456789 \t\n"
+YDK_SECTION_NAMES = {b"#main": "main", b"#extra": "extra", b"!side": "side"}
 
 
 class FormatDecodeException(Exception):
     pass
 
 
-class TypedDeck:
-    def __init__(self, main, extra, side):
-        self.main = main
-        self.extra = extra
-        self.side = side
+class FormatEncodeException(Exception):
+    pass
+
+
+class Deck:
+    """Deck of passcodes stored in one read-only uint32 buffer, with each section a contiguous slice
+
+    Sections are available as attributes or by key (deck["main"]). Unique passcodes with their
+    counts and the content hash are computed on first use and kept.
+    """
+
+    __slots__ = ("_cards", "_main_end", "_extra_end", "_unique", "_hash")
+
+    def __init__(self, main=(), extra=(), side=()):
+        main = np.asarray(main, dtype=np.uint32)
+        extra = np.asarray(extra, dtype=np.uint32)
+        side = np.asarray(side, dtype=np.uint32)
+
+        self._cards = np.concatenate([main, extra, side])
+        self._cards.flags.writeable = False
+        self._main_end = len(main)
+        self._extra_end = len(main) + len(extra)
+        self._unique = None
+        self._hash = None
+
+    @classmethod
+    def from_buffer(cls, cards, main_count, extra_count):
+        """Build a Deck around an existing uint32 array holding main, extra and side in that order"""
+        deck = cls.__new__(cls)
+        deck._cards = np.ascontiguousarray(cards, dtype=np.uint32)
+        deck._cards.flags.writeable = False
+        deck._main_end = main_count
+        deck._extra_end = main_count + extra_count
+        deck._unique = None
+        deck._hash = None
+        return deck
+
+    @property
+    def main(self):
+        return self._cards[:self._main_end]
+
+    @property
+    def extra(self):
+        return self._cards[self._main_end:self._extra_end]
+
+    @property
+    def side(self):
+        return self._cards[self._extra_end:]
+
+    def __getitem__(self, section):
+        if section not in SECTIONS:
+            raise KeyError(section)
+        return getattr(self, section)
+
+    def __len__(self):
+        return len(self._cards)
+
+    def __eq__(self, other):
+        if not isinstance(other, Deck):
+            return NotImplemented
+        return self.content_hash == other.content_hash
+
+    def __hash__(self):
+        return hash(self.content_hash)
+
+    def all_ids(self):
+        """Return every passcode of the deck, main then extra then side"""
+        return self._cards
+
+    def unique(self, section):
+        """Return the unique passcodes of a section in deck order, and how many copies of each it holds"""
+        if self._unique is None:
+            self._unique = {}
+        if section not in self._unique:
+            ids, first_index, counts = np.unique(self[section], return_index=True, return_counts=True)
+            order = np.argsort(first_index, kind="stable")
+            self._unique[section] = (ids[order], counts[order])
+        return self._unique[section]
+
+    @property
+    def content_hash(self):
+        """Stable hex digest of the deck contents, independent of how it was loaded"""
+        if self._hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(np.array([self._main_end, self._extra_end], dtype="<u4").tobytes())
+            digest.update(self._cards.astype("<u4", copy=False).tobytes())
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    def to_dict(self):
+        """Return the deck as a dict of Python int lists"""
+        return {section: self[section].tolist() for section in SECTIONS}
 
 
 def base64_to_passcodes(base64_string):
@@ -21,58 +120,95 @@ def base64_to_passcodes(base64_string):
 
 
 def parse_ydke_url(ydke_url):
-    """Parse a YDKE URL and return a TypedDeck object"""
+    """Parse a YDKE URL and return a Deck object"""
     if not ydke_url.startswith("ydke://"):
         raise ValueError("Unrecognized URL protocol")
     components = ydke_url[len("ydke://"):].split("!")
     if len(components) < 3:
         raise ValueError("Missing ydke URL component")
-    return TypedDeck(
+    return Deck(
         main=base64_to_passcodes(components[0]),
         extra=base64_to_passcodes(components[1]),
         side=base64_to_passcodes(components[2])
     )
 
 
-def parse_ydk_file(file_path):
+def _ydk_markers(data):
+    """Return the (start, end, section) offsets of every section marker line, in file order"""
+    markers = []
+    for marker, section in YDK_SECTION_NAMES.items():
+        start = data.find(marker)
+        while start != -1:
+            line_start = data.rfind(b"\n", 0, start) + 1
+            line_end = data.find(b"\n", start)
+            if line_end == -1:
+                line_end = len(data)
+            # Only a marker alone on its line counts, anything else is a comment
+            if not data[line_start:start].strip() and not data[start + len(marker):line_end].strip():
+                markers.append((line_start, line_end, section))
+            start = data.find(marker, start + len(marker))
+    return sorted(markers)
+
+
+def _ydk_sections(data):
+    """Return the raw bytes of each section of a YDK file, located by the offsets of its markers"""
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    # Markers and passcodes are found by "\n" line ends, so Windows and old Mac files are normalised first
+    if b"\r" in data:
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    chunks = {"main": [], "extra": [], "side": []}
+    section, position = None, 0
+    # Lines before the first marker belong to no section and are skipped
+    for start, end, next_section in _ydk_markers(data):
+        if section is not None:
+            chunks[section].append(data[position:start])
+        section, position = next_section, end
+    if section is not None:
+        chunks[section].append(data[position:])
+
+    return [b"\n".join(chunks[section]) for section in SECTIONS]
+
+
+def _is_plain_section(chunk):
+    """Whether a section holds nothing but lines of a single run of digits"""
+    if chunk.translate(None, YDK_LINE_CHARACTERS):
+        return False
+    # Lines holding several numbers are junk, they merge into one token once blanks are removed
+    return len(chunk.split()) == len(chunk.translate(None, b" \t").split())
+
+
+def _section_passcodes(chunk):
+    """Convert the passcode lines of a section to integers in one vectorised step"""
+    if not _is_plain_section(chunk):
+        # Pick the passcode lines out from between comments and other junk
+        chunk = b" ".join(YDK_CARD.findall(chunk))
+    if not chunk or chunk.isspace():
+        return np.zeros(0, dtype=np.uint64)
+    return np.fromstring(chunk, dtype=np.uint64, sep=" ")
+
+
+def _deck_from_sections(sections):
+    """Build a Deck from the parsed values of each section, dropping values that don't fit a uint32"""
+    values = np.concatenate(sections)
+    if len(values) and values.max() > np.iinfo(np.uint32).max:
+        return Deck(*(section[section <= np.iinfo(np.uint32).max] for section in sections))
+    return Deck.from_buffer(values.astype(np.uint32), len(sections[0]), len(sections[1]))
+
+
+def parse_ydk_bytes(data):
+    """Parse the contents of a YDK file and return a Deck object"""
+    return _deck_from_sections([_section_passcodes(chunk) for chunk in _ydk_sections(data)])
+
+
+def parse_ydk_file(file_path, verbose=True):
     """Parse a YDK file and separate cards into main, extra, and side decks"""
-    deck = {"main": [], "extra": [], "side": []}
-    current_section = None
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Handle section markers
-            if line.startswith("#"):
-                if line == "#main":
-                    current_section = "main"
-                    continue
-                elif line == "#extra":
-                    current_section = "extra"
-                    continue
-                else:
-                    # Skip other comment lines
-                    continue
-
-            if line == "!side":
-                current_section = "side"
-                continue
-
-            if current_section is None:
-                continue
-
-            # Try to parse the card ID
-            try:
-                card_id = int(line)
-                deck[current_section].append(card_id)
-            except ValueError:
-                # Skip non-integer lines
-                pass
-
-    print(f"Parsed YDK file: {len(deck['main'])} main, {len(deck['extra'])} extra, {len(deck['side'])} side cards")
+    with open(file_path, "rb") as f:
+        deck = parse_ydk_bytes(f.read())
+
+    if verbose:
+        print(f"Parsed YDK file: {len(deck['main'])} main, {len(deck['extra'])} extra, {len(deck['side'])} side cards")
     return deck
 
 
@@ -80,32 +216,58 @@ class OmegaFormatDecoder:
     """Decoder for EDOPro/Omega deck format"""
 
     def decode(self, encoded):
+        raw = self.inflate(encoded)
+        main_and_extra_count, side_count, codes = self.unpack_codes(raw)
+        return Deck(
+            main=codes[:min(main_and_extra_count, 40)],
+            extra=codes[40:main_and_extra_count],
+            side=codes[main_and_extra_count:]
+        )
+
+    def decode_many(self, encoded_decks):
+        """Decode an iterable of Omega strings, returns a list of decks"""
+        return [self.decode(encoded) for encoded in encoded_decks]
+
+    def inflate(self, encoded):
         encoded = encoded.strip()
         deflated = base64.b64decode(encoded)
         try:
-            raw = zlib.decompress(deflated, -zlib.MAX_WBITS)
+            return zlib.decompress(deflated, -zlib.MAX_WBITS)
         except zlib.error as e:
             raise FormatDecodeException(f"could not inflate compressed data: {e}")
-        main_and_extra_count, raw = self.unpack('B', raw)
-        side_count, raw = self.unpack('B', raw)
-        deck_list = {"main": [], "extra": [], "side": []}
-        for _ in range(main_and_extra_count):
-            code, raw = self.unpack_code(raw)
-            if len(deck_list["main"]) < 40:
-                deck_list["main"].append(code)
-            else:
-                deck_list["extra"].append(code)
-        for _ in range(side_count):
-            code, raw = self.unpack_code(raw)
-            deck_list["side"].append(code)
-        return deck_list
-
-    def unpack_code(self, data):
-        return self.unpack('I', data)
-
-    def unpack(self, format, data):
-        size = struct.calcsize(format)
-        unpacked = struct.unpack(format, data[:size])
-        if not unpacked:
+
+    def unpack_codes(self, raw):
+        """Read the two count bytes and every card code from an inflated payload without copying it"""
+        data = memoryview(raw)
+        if len(data) < 2:
             raise FormatDecodeException("unexpected end of input")
-        return unpacked[0], data[size:]
\ No newline at end of file
+        main_and_extra_count, side_count = data[0], data[1]
+
+        total = main_and_extra_count + side_count
+        available = (len(data) - 2) // 4
+        if available < total:
+            raise FormatDecodeException(
+                f"unexpected end of input: expected {total} card codes, found {available}")
+
+        codes = np.frombuffer(data, dtype="<u4", count=total, offset=2)
+        return main_and_extra_count, side_count, codes
+
+
+class OmegaFormatEncoder:
+    """Encoder for EDOPro/Omega deck format"""
+
+    def encode(self, deck):
+        main_and_extra = np.concatenate([np.asarray(deck["main"], dtype="<u4"),
+                                         np.asarray(deck["extra"], dtype="<u4")])
+        side = np.asarray(deck["side"], dtype="<u4")
+        if len(main_and_extra) > 255 or len(side) > 255:
+            raise FormatEncodeException("Omega format holds at most 255 main/extra and 255 side cards")
+
+        raw = bytes((len(main_and_extra), len(side))) + main_and_extra.tobytes() + side.tobytes()
+        compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        deflated = compressor.compress(raw) + compressor.flush()
+        return base64.b64encode(deflated).decode("ascii")
+
+    def encode_many(self, decks):
+        """Encode an iterable of decks, returns a list of Omega strings"""
+        return [self.encode(deck) for deck in decks]
@@ -0,0 +1,264 @@
+import random
+import threading
+import time
+
+from app import metrics
+from app.lazy import lazy_import
+
+requests = lazy_import("requests")
+
+# YGOProDeck allows 20 requests per second per IP, stay comfortably below it
+RATE_LIMIT = 15
+BURST = 5
+
+# Per request (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# Retries of transient failures, with full-jitter exponential backoff between attempts
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# Statuses worth retrying, 429 also halves the concurrency limit
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def seconds_left(deadline, clock=time.monotonic):
+    """Seconds left until deadline, None when there is no deadline"""
+    if deadline is None:
+        return None
+    return deadline - clock()
+
+
+class TokenBucket:
+    """Token bucket rate limiter shared by all request threads"""
+
+    def __init__(self, rate=RATE_LIMIT, capacity=BURST, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def reserve(self):
+        """Take one token if there is one and return 0, otherwise return the seconds until the next one
+
+        Lets callers that must not block, such as coroutines, do their own waiting.
+        """
+        with self._lock:
+            now = self._clock()
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate + max(0.0, self._updated - now)
+
+    def acquire(self, deadline=None):
+        """Take one token, waiting for it if needed. Returns False if the deadline passes first"""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return True
+
+            remaining = seconds_left(deadline, self._clock)
+            if remaining is not None and remaining < wait:
+                return False
+            self._sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next seconds, used when the server asks us to slow down"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, self._clock() + seconds)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on requests in flight: +1/limit per success, halved on every 429"""
+
+    def __init__(self, max_limit, min_limit=1, clock=time.monotonic):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._clock = clock
+        self._condition = threading.Condition()
+
+    def try_acquire(self):
+        """Take a request slot if one is free, returns whether it did
+
+        Lets callers that must not block, such as coroutines, poll for a slot.
+        """
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self, deadline=None):
+        """Take a request slot. Returns False if the deadline passes first"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = seconds_left(deadline, self._clock)
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class FetchScheduler:
+    """Send GET requests through a session under a rate limit, a concurrency limit, timeouts and retries"""
+
+    def __init__(self, session, rate=RATE_LIMIT, burst=BURST, max_concurrency=8,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, clock=time.monotonic, sleep=time.sleep):
+        self.session = session
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, clock=clock)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # Connection level failures worth retrying
+        self._retry_exceptions = (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        )
+        self._counters = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0}
+
+    def count(self, name):
+        """Add one to a request counter, for transports sending requests outside get()"""
+        with self._lock:
+            self._counters[name] += 1
+
+    def request_timeout(self, deadline):
+        """(connect, read) timeouts, shortened so no single request outlives the deadline"""
+        remaining = seconds_left(deadline, self._clock)
+        if remaining is None:
+            return self.timeout
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline passed before the request was sent")
+        connect, read = self.timeout
+        return (min(connect, remaining), min(read, remaining))
+
+    def backoff_delay(self, attempt, retry_after, deadline):
+        """Seconds to wait before the next attempt, raising DeadlineExceeded if it would end past the deadline"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        remaining = seconds_left(deadline, self._clock)
+        if remaining is not None and remaining < delay:
+            raise DeadlineExceeded("Deadline passed while backing off")
+        return delay
+
+    def end_attempt(self, attempt, url, deadline, status=None, response=None, error=None):
+        """Release the request slot of one attempt and account for how it ended, for every transport
+
+        Takes the response status and the response, whose Retry-After header is honoured, or the
+        connection error that ended the attempt. Returns the seconds to wait before the next attempt,
+        or None when there is none: the status is final or the retries are used up. Raises
+        DeadlineExceeded when the wait would end past the deadline.
+        """
+        throttled = error is None and status == 429
+        self.concurrency.release(throttled=throttled)
+        if error is not None:
+            self.count("errors")
+            metrics.count(f"http.error.{type(error).__name__}")
+        else:
+            metrics.count(f"http.status.{status}")
+            if status not in RETRY_STATUSES:
+                return None
+
+        retry_after = None
+        if throttled:
+            self.count("throttled")
+            retry_after = retry_after_seconds(response)
+            self.bucket.pause(retry_after if retry_after is not None else 1.0)
+        if attempt >= self.max_retries:
+            return None
+
+        self.count("retries")
+        if error is not None:
+            print(f"Retrying request to {url} after error: {error}")
+        return self.backoff_delay(attempt + 1, retry_after, deadline)
+
+    def get(self, url, params=None, deadline=None):
+        """GET url, retrying 429/5xx responses and connection errors
+
+        deadline is an absolute time.monotonic() value. Raises DeadlineExceeded when it passes,
+        requests.HTTPError when a retryable status persists and the last connection error when
+        those persist.
+        """
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(deadline):
+                raise DeadlineExceeded("Deadline passed waiting for the rate limiter")
+            if not self.concurrency.acquire(deadline):
+                raise DeadlineExceeded("Deadline passed waiting for a request slot")
+
+            try:
+                self.count("requests")
+                with metrics.timer("http.latency"):
+                    response = self.session.get(url, params=params, timeout=self.request_timeout(deadline))
+            except self._retry_exceptions as e:
+                delay = self.end_attempt(attempt, url, deadline, error=e)
+                if delay is None:
+                    raise
+            except BaseException:
+                self.concurrency.release()
+                raise
+            else:
+                delay = self.end_attempt(attempt, url, deadline, response.status_code, response)
+                if delay is None:
+                    if response.status_code in RETRY_STATUSES:
+                        raise requests.HTTPError(f"{response.status_code} from {url} after {attempt + 1} attempts",
+                                                 response=response)
+                    return response
+
+            attempt += 1
+            self._sleep(delay)
+
+    def stats(self):
+        """Return request/retry/throttle counters and the current concurrency limit"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        return stats
+
+
+def retry_after_seconds(response):
+    """Seconds from a Retry-After header, None if absent or not a number"""
+    try:
+        return max(0.0, float(response.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+def deadline_after(seconds):
+    """Absolute deadline for FetchScheduler.get, None when seconds is None"""
+    if seconds is None:
+        return None
+    return time.monotonic() + seconds
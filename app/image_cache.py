@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from app import metrics
+from app.atlas import ATLAS_PATH
+from app.card_store import default_cache_dir
+from app.fetch_scheduler import CONNECT_TIMEOUT, READ_TIMEOUT
+from app.lazy import lazy_import
+
+requests = lazy_import("requests")
+
+IMAGE_HOST = "https://images.ygoprodeck.com"
+
+# Default cap of the on-disk image cache
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Maximum number of image downloads in flight at once
+MAX_WORKERS = 8
+
+# Image paths the cache and the server accept, e.g. /images/cards_cropped/89631139.jpg
+IMAGE_PATH = re.compile(r"^/images/(cards|cards_small|cards_cropped)/(\d{1,10})\.jpg$")
+
+
+def default_image_dir():
+    """Return the directory the image cache lives in"""
+    return os.path.join(default_cache_dir(), "images")
+
+
+class ImageCache:
+    """Card images downloaded once into a size-bounded least recently used cache on disk"""
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES, max_workers=MAX_WORKERS):
+        self.directory = directory or default_image_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # image path -> size in bytes, least recently used first
+        self._inflight = {}
+        self._size = 0
+        self.hits = 0
+        self.downloads = 0
+
+        self.max_workers = max_workers
+        self._session = None  # Created on the first download
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-fetch")
+        self._scan()
+
+    def _scan(self):
+        """Index the images already on disk, oldest access first"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                file_path = os.path.join(root, name)
+                image_path = "/" + os.path.relpath(file_path, self.directory).replace(os.sep, "/")
+                if not IMAGE_PATH.match(image_path):
+                    continue
+                stat = os.stat(file_path)
+                found.append((stat.st_mtime, image_path, stat.st_size))
+
+        for _, image_path, size in sorted(found):
+            self._entries[image_path] = size
+            self._size += size
+
+    def _file(self, image_path):
+        return os.path.join(self.directory, *image_path.strip("/").split("/"))
+
+    def get(self, image_path):
+        """Return the local file of an image, downloading it on first use
+
+        Returns None for paths outside IMAGE_PATH and for images the CDN does not have.
+        """
+        if not IMAGE_PATH.match(image_path):
+            return None
+
+        with self._lock:
+            if image_path in self._entries:
+                self._entries.move_to_end(image_path)
+                self.hits += 1
+                hit = True
+            else:
+                hit = False
+                # Concurrent requests for the same image share one download
+                future = self._inflight.get(image_path)
+                owner = future is None
+                if owner:
+                    future = self._inflight[image_path] = Future()
+
+        file_path = self._file(image_path)
+        if hit:
+            try:
+                # Persist the recency so the LRU order survives restarts
+                os.utime(file_path)
+            except OSError:
+                pass
+            return file_path
+
+        if not owner:
+            return future.result()
+
+        try:
+            file_path = self._download(image_path)
+        except Exception as e:
+            print(f"Error downloading image {image_path}: {e}")
+            file_path = None
+        with self._lock:
+            del self._inflight[image_path]
+        future.set_result(file_path)
+        return file_path
+
+    @property
+    def session(self):
+        """Keep-alive session for image downloads"""
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def _download(self, image_path):
+        with metrics.timer("http.image_latency"):
+            response = self.session.get(IMAGE_HOST + image_path, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        metrics.count(f"http.image_status.{response.status_code}")
+        if response.status_code != 200:
+            return None
+
+        file_path = self._file(image_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial image
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(temp_path, file_path)
+
+        with self._lock:
+            self.downloads += 1
+            self._entries[image_path] = len(response.content)
+            self._size += len(response.content)
+            evicted = self._evict()
+        for path in evicted:
+            try:
+                os.remove(self._file(path))
+            except OSError:
+                pass
+        return file_path
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits max_bytes, returns their paths"""
+        evicted = []
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            image_path, size = self._entries.popitem(last=False)
+            self._size -= size
+            evicted.append(image_path)
+        return evicted
+
+    def prefetch(self, image_paths):
+        """Download the given images in the background, returns the futures"""
+        return [self._executor.submit(self.get, image_path) for image_path in dict.fromkeys(image_paths)
+                if image_path not in self._entries]
+
+    def info(self):
+        """Return the location, size and counters of the cache"""
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "images": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "downloads": self.downloads
+            }
+
+    def clear(self):
+        """Delete every cached image"""
+        with self._lock:
+            paths = list(self._entries)
+            self._entries.clear()
+            self._size = 0
+        for image_path in paths:
+            try:
+                os.remove(self._file(image_path))
+            except OSError:
+                pass
+
+
+def url_image_path(url):
+    """The cache path of a YGOProDeck image URL, None for any other URL"""
+    if not url or not url.startswith(IMAGE_HOST + "/"):
+        return None
+    path = urlparse(url).path
+    return path if IMAGE_PATH.match(path) else None
+
+
+class _ImageRequestHandler(BaseHTTPRequestHandler):
+    cache = None
+    atlases = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        atlas = ATLAS_PATH.match(path)
+        if atlas is not None:
+            file_path = self.atlases.file(atlas.group(1)) if self.atlases is not None else None
+        else:
+            file_path = self.cache.get(path)
+        if file_path is None:
+            self.send_error(404)
+            return
+
+        try:
+            with open(file_path, "rb") as f:
+                body = f.read()
+        except OSError:
+            # Evicted between lookup and read, or an atlas that was never built
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=86400")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ImageServer:
+    """Localhost HTTP server answering /images/... requests from an ImageCache
+
+    With an AtlasStore it also serves deck atlases under /atlas/.
+    """
+
+    def __init__(self, cache, host="127.0.0.1", port=0, atlases=None):
+        self.cache = cache
+        self.atlases = atlases
+        handler = type("ImageRequestHandler", (_ImageRequestHandler,), {"cache": cache, "atlases": atlases})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="image-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def local_url(self, url):
+        """Rewrite a YGOProDeck image URL to this server, other URLs are returned unchanged"""
+        path = url_image_path(url)
+        return self.url + path if path is not None else url
+
+    def prefetch(self, urls):
+        """Download the images behind the given URLs in the background"""
+        return self.cache.prefetch(path for path in map(url_image_path, urls) if path is not None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and maintain the card image cache")
+    parser.add_argument("command", choices=["info", "clear"])
+    parser.add_argument("--path", help="directory of the cache (defaults to the user cache directory)")
+    args = parser.parse_args(argv)
+
+    cache = ImageCache(args.path)
+    if args.command == "clear":
+        cache.clear()
+    print(json.dumps(cache.info(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
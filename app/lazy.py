@@ -0,0 +1,47 @@
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+# Serialises the first use of lazy modules, a module must never be seen half executed
+_import_lock = threading.RLock()
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __getattr__(self, attr):
+        with _import_lock:
+            module = sys.modules.get(self.__name__)
+            if module is self or module is None:
+                sys.modules.pop(self.__name__, None)
+                try:
+                    module = importlib.import_module(self.__name__)
+                except BaseException:
+                    sys.modules[self.__name__] = self
+                    raise
+            # Later lookups on the stand-in find the attributes without coming back here
+            self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """Return a module that is only executed when one of its attributes is first used
+
+    Keeps numpy and requests out of the startup path; modules already imported are returned as is.
+    Unlike importlib.util.LazyLoader before Python 3.12, the first use is safe from any thread.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    module = _LazyModule(name)
+    # find_spec() and other import machinery read these from sys.modules before the first use
+    module.__spec__ = spec
+    module.__loader__ = spec.loader
+    sys.modules[name] = module
+    return module
@@ -0,0 +1,163 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Set to a true value to record metrics from startup, e.g. YGO_METRICS=1
+METRICS_ENV = "YGO_METRICS"
+
+# Set to a path to record metrics from startup and have the app write them there as JSON on exit
+METRICS_FILE_ENV = "YGO_METRICS_FILE"
+
+# Upper bounds in milliseconds of the latency histogram buckets, the last bucket is unbounded
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Whether metrics are recorded, checked before any work so disabled metrics cost one global lookup
+enabled = False
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """Count, sum, extremes and bucketed distribution of millisecond durations"""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, value)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples, capped at the maximum"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets[:-1]):
+            seen += bucket
+            if seen >= rank:
+                return round(min(BUCKET_BOUNDS_MS[index], self.max), 3)
+        return round(self.max, 3)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "min_ms": round(self.min, 3) if self.min is not None else None,
+            "max_ms": round(self.max, 3) if self.max is not None else None,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip([f"le_{bound}" for bound in BUCKET_BOUNDS_MS] + ["inf"], self.buckets)),
+        }
+
+
+class _Timer:
+    """Context manager adding its elapsed milliseconds to a histogram"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, (time.perf_counter() - self.start) * 1e3)
+        return False
+
+
+class _NullTimer:
+    """Shared do-nothing stand-in for _Timer while metrics are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable(on=True):
+    """Start (or with on=False stop) recording metrics"""
+    global enabled
+    enabled = bool(on)
+
+
+def disable():
+    enable(False)
+
+
+def count(name, value=1):
+    """Add value to a counter"""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, milliseconds):
+    """Add a duration in milliseconds to a histogram"""
+    if not enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(milliseconds)
+
+
+def timer(name):
+    """Context manager timing its block into the histogram called name"""
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def snapshot():
+    """Return every counter and histogram as a JSON serialisable dict"""
+    with _lock:
+        return {
+            "enabled": enabled,
+            "counters": dict(sorted(_counters.items())),
+            "histograms": {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())},
+        }
+
+
+def reset():
+    """Forget every recorded value"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def dump(path, report=None):
+    """Write a report, by default the snapshot, to path as JSON"""
+    data = snapshot() if report is None else report
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+if os.environ.get(METRICS_FILE_ENV) or os.environ.get(METRICS_ENV, "").strip().lower() not in ("", "0", "false", "no"):
+    enable()
@@ -0,0 +1,290 @@
+import argparse
+import gzip
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse
+
+from app import card_service, metrics
+from app.api import DeckViewerAPI
+
+# DeckViewerAPI methods callable over HTTP, POST /api/<method> with the arguments as a JSON object
+API_METHODS = frozenset({
+    "load_ydk_file", "load_ydk_text", "load_ydke_url", "load_omega_format",
+    "get_deck_info", "get_wants_list", "start_deck_load", "get_deck_progress", "get_card_text",
+    "list_decks", "switch_deck", "close_deck", "get_cache_stats", "get_metrics",
+})
+
+# Header carrying the session id, sent back with every response
+SESSION_HEADER = "X-Session-Id"
+
+# Sessions kept at once and seconds an idle session lives, the least recently used go first
+MAX_SESSIONS = 1000
+SESSION_TTL = 30 * 60
+
+# Request handler threads, each serves one keep-alive connection at a time
+MAX_WORKERS = 32
+
+# Seconds an idle keep-alive connection holds its worker before it is closed
+KEEP_ALIVE_TIMEOUT = 5
+
+# Largest request body accepted, enough for any YDK file
+MAX_BODY_BYTES = 1024 * 1024
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+
+class Session:
+    """One client's DeckViewerAPI, calls on it are serialised so its open decks stay consistent"""
+
+    def __init__(self, session_id, api):
+        self.session_id = session_id
+        self.api = api
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """Sessions by id with LRU and idle-time expiry, all sharing the process-wide card cache"""
+
+    def __init__(self, api_factory=DeckViewerAPI, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL,
+                 clock=time.monotonic):
+        self.api_factory = api_factory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def get(self, session_id=None):
+        """Return the live session with session_id, or a new one if there is none"""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session_id = secrets.token_urlsafe(16)
+                session = self._sessions[session_id] = Session(session_id, self.api_factory())
+                metrics.count("server.sessions_created")
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def _expire(self, now):
+        """Drop sessions idle for longer than ttl, the caller holds the lock"""
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+
+def _resolve_deck_path(deck_dir, file_path):
+    """Absolute path of a deck file inside deck_dir, None for paths outside it"""
+    if deck_dir is None:
+        return None
+    root = os.path.realpath(deck_dir)
+    path = os.path.realpath(os.path.join(root, file_path))
+    return path if os.path.commonpath([root, path]) == root else None
+
+
+class _DeckRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+    sessions = None
+    deck_dir = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self._send_json(404, {"status": "error", "message": "Not found"})
+            return
+        self._send_json(200, {"status": "success", "sessions": len(self.sessions)})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        method = path[len("/api/"):] if path.startswith("/api/") else None
+        if method not in API_METHODS:
+            self._discard_body()
+            self._send_json(404, {"status": "error", "message": f"Unknown method: {path}"})
+            return
+
+        try:
+            arguments = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {"status": "error", "message": str(e)})
+            return
+
+        session = self.sessions.get(self.headers.get(SESSION_HEADER))
+        try:
+            inspect.signature(getattr(session.api, method)).bind(**arguments)
+        except TypeError as e:
+            # Missing or unexpected arguments, checked up front so TypeErrors raised by the API are 500s
+            self._send_json(400, {"status": "error", "message": str(e)}, session.session_id)
+            return
+
+        try:
+            with session.lock, metrics.timer(f"server.{method}"):
+                result = self._call(session.api, method, arguments)
+            status = 200
+        except Exception as e:
+            print(f"Error handling {method}: {e}")
+            result, status = {"status": "error", "message": str(e)}, 500
+        self._send_json(status, result, session.session_id)
+
+    def _call(self, api, method, arguments):
+        if method == "load_ydk_file":
+            # Clients may only open files below the configured deck directory
+            file_path = _resolve_deck_path(self.deck_dir, str(arguments.get("file_path", "")))
+            if file_path is None:
+                return {"status": "error", "message": "Deck files are not available from this server"}
+            arguments = dict(arguments, file_path=file_path)
+        return getattr(api, method)(**arguments)
+
+    def _discard_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if 0 < length <= MAX_BODY_BYTES:
+            self.rfile.read(length)
+        elif length:
+            self.close_connection = True
+
+    def _read_json(self):
+        """The request body as a dict of keyword arguments, an empty body means none"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ValueError("Request body too large")
+        if not length:
+            return {}
+        try:
+            arguments = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ValueError("Request body is not valid JSON")
+        if not isinstance(arguments, dict):
+            raise ValueError("Request body must be a JSON object of arguments")
+        return arguments
+
+    def _send_json(self, status, payload, session_id=None):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        encoding = None
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            encoding = "gzip"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if session_id is not None:
+            self.send_header(SESSION_HEADER, session_id)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _PooledHTTPServer(HTTPServer):
+    """HTTPServer handing each connection to a fixed pool of worker threads"""
+
+    # Connections waiting to be accepted, the default of 5 drops bursts of new clients
+    request_queue_size = 128
+
+    def __init__(self, address, handler, max_workers):
+        super().__init__(address, handler)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deck-server")
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+class DeckServer:
+    """HTTP JSON service exposing DeckViewerAPI to many clients, one session per client
+
+    Clients call POST /api/<method> with the method's arguments as a JSON object. The response
+    carries an X-Session-Id header to send with later requests; requests without a live session
+    id start a new session. Every session has its own open decks while cards are resolved through
+    the shared card cache. Responses are gzipped for clients that accept it.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, max_workers=MAX_WORKERS, deck_dir=None, sessions=None):
+        self.sessions = sessions if sessions is not None else SessionStore()
+        handler = type("DeckRequestHandler", (_DeckRequestHandler,),
+                       {"sessions": self.sessions, "deck_dir": deck_dir})
+        self._server = _PooledHTTPServer((host, port), handler, max_workers)
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="deck-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the deck viewer API over HTTP as JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="request handler threads")
+    parser.add_argument("--deck-dir", help="directory load_ydk_file may open decks from, disabled by default")
+    parser.add_argument("--api-url", help="cardinfo.php endpoint to use instead of YGOProDeck's")
+    parser.add_argument("--rate-limit", type=float, help="upstream requests per second")
+    parser.add_argument("--catalogue", default=None,
+                        help="offline catalogue directory (default: the user cache catalogue when built)")
+    parser.add_argument("--store", default=None,
+                        help="card store path (default: the user cache store, '' to disable)")
+    args = parser.parse_args(argv)
+
+    if args.api_url:
+        card_service.API_URL = args.api_url
+    if args.rate_limit:
+        card_service.configure_fetcher(rate_limit=args.rate_limit)
+    card_service.open_card_sources(args.store, args.catalogue)
+
+    server = DeckServer(args.host, args.port, max_workers=args.workers, deck_dir=args.deck_dir)
+    print(f"Serving the deck API on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
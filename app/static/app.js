@@ -0,0 +1,768 @@
+// Round trip timings of bridge calls by method, recorded while the metrics panel is open
+let debugMetrics = false;
+let bridgeTimings = {};
+
+// Call a Python API method through the pywebview bridge
+async function callApi(method, ...args) {
+    if (!debugMetrics) {
+        return pywebview.api[method](...args);
+    }
+    const start = performance.now();
+    try {
+        return await pywebview.api[method](...args);
+    } finally {
+        const elapsed = performance.now() - start;
+        const timing = bridgeTimings[method] || (bridgeTimings[method] = {count: 0, total: 0, max: 0});
+        timing.count += 1;
+        timing.total += elapsed;
+        timing.max = Math.max(timing.max, elapsed);
+    }
+}
+
+// Utility functions
+function showLoading() {
+    document.getElementById('loading').classList.remove('hidden');
+}
+
+function hideLoading() {
+    document.getElementById('loading').classList.add('hidden');
+}
+
+function showCardPreview(card) {
+    const previewElement = document.getElementById('cardPreview');
+    const imageElement = document.getElementById('previewImage');
+    const nameElement = document.getElementById('previewName');
+    const infoElement = document.getElementById('previewInfo');
+
+    // Set image and name
+    imageElement.src = card.image_url || 'https://images.ygoprodeck.com/images/cards/back_high.jpg';
+    nameElement.textContent = card.name || 'Unknown Card';
+
+    // Clear previous info
+    infoElement.innerHTML = '';
+
+    // Add card details
+    if (card.type) {
+        addInfoRow(infoElement, 'Type', card.type);
+    }
+
+    if (card.race) {
+        addInfoRow(infoElement, 'Race', card.race);
+    }
+
+    if (card.attribute) {
+        addInfoRow(infoElement, 'Attribute', card.attribute);
+    }
+
+    if (card.level) {
+        addInfoRow(infoElement, 'Level/Rank', card.level);
+    }
+
+    if (card.atk !== undefined) {
+        addInfoRow(infoElement, 'ATK', card.atk);
+    }
+
+    if (card.def !== undefined) {
+        addInfoRow(infoElement, 'DEF', card.def);
+    }
+
+    if (card.desc) {
+        const descRow = document.createElement('div');
+        descRow.className = 'mt-4';
+        descRow.innerHTML = `
+            <h3 class="font-bold text-primary">Description</h3>
+            <p class="mt-1 text-gray-300">${card.desc}</p>
+        `;
+        infoElement.appendChild(descRow);
+    }
+
+    // Show the preview
+    previewElement.classList.remove('hidden');
+}
+
+function closeCardPreview() {
+    document.getElementById('cardPreview').classList.add('hidden');
+}
+
+function addInfoRow(container, label, value) {
+    const row = document.createElement('div');
+    row.className = 'flex justify-between border-b border-gray-700 py-1';
+    row.innerHTML = `
+        <span class="font-medium">${label}:</span>
+        <span>${value}</span>
+    `;
+    container.appendChild(row);
+}
+
+function showImportForm() {
+    document.getElementById('importFormContainer').classList.remove('hidden');
+    document.getElementById('noDeckMessage').classList.add('hidden');
+}
+
+function hideImportForm() {
+    document.getElementById('importFormContainer').classList.add('hidden');
+    if (!document.getElementById('deckContent').classList.contains('hidden')) {
+        document.getElementById('noDeckMessage').classList.add('hidden');
+    } else {
+        document.getElementById('noDeckMessage').classList.remove('hidden');
+    }
+}
+
+// Card details by id, filled in as a progressive deck load resolves them
+let deckCards = {};
+
+async function openCardPreview(cardId) {
+    const card = deckCards[cardId];
+    if (!card) {
+        return;
+    }
+
+    // Compact loads only carry the grid fields, fetch the rest the first time a card is opened
+    if (card.desc === undefined) {
+        const details = await callApi('get_card_text', cardId);
+        if (details && details.status === 'success') {
+            Object.assign(card, details.card);
+        }
+    }
+    showCardPreview(card);
+}
+
+// Rendering functions
+function renderCardSection(elementId, cards) {
+    const container = document.getElementById(elementId);
+    container.innerHTML = '';
+
+    cards.forEach(entry => {
+        // Compact sections hold [id, count] pairs, with card details in deckCards once known
+        const card = Array.isArray(entry) ? { ...deckCards[entry[0]], id: entry[0], count: entry[1] } : entry;
+        if (card.name) {
+            deckCards[card.id] = card;
+        }
+
+        const cardElement = document.createElement('div');
+        cardElement.className = 'card-container relative';
+
+        // Card count badge for multiple copies
+        let countBadge = '';
+        if (card.count > 1) {
+            countBadge = `<div class="absolute top-0 right-0 bg-primary text-white rounded-full w-6 h-6 flex items-center justify-center font-bold z-10">
+                ${card.count}
+            </div>`;
+        }
+
+        cardElement.innerHTML = countBadge;
+        cardElement.appendChild(cardImageElement(card));
+
+        container.appendChild(cardElement);
+    });
+}
+
+// Thumbnail atlas of the current deck, cards with a tile in it are drawn from one shared image
+let deckAtlas = null;
+
+function atlasTileStyle(cardId) {
+    if (!deckAtlas || deckAtlas.tiles[cardId] === undefined) {
+        return null;
+    }
+    const index = deckAtlas.tiles[cardId];
+    const column = index % deckAtlas.columns;
+    const row = Math.floor(index / deckAtlas.columns);
+    const x = deckAtlas.columns > 1 ? column / (deckAtlas.columns - 1) * 100 : 0;
+    const y = deckAtlas.rows > 1 ? row / (deckAtlas.rows - 1) * 100 : 0;
+    return `background-image: url('${deckAtlas.url}'); ` +
+        `background-size: ${deckAtlas.columns * 100}% ${deckAtlas.rows * 100}%; ` +
+        `background-position: ${x}% ${y}%; aspect-ratio: ${deckAtlas.tile[0]} / ${deckAtlas.tile[1]};`;
+}
+
+function cardImageElement(card) {
+    const tileStyle = atlasTileStyle(card.id);
+    let element;
+    if (tileStyle) {
+        element = document.createElement('div');
+        element.setAttribute('style', tileStyle);
+        element.setAttribute('role', 'img');
+        element.title = card.name || '';
+    } else {
+        element = document.createElement('img');
+        element.src = card.image_url || 'https://images.ygoprodeck.com/images/cards/back_high.jpg';
+        element.alt = card.name || '';
+        element.onerror = () => {
+            element.onerror = null;
+            element.src = 'https://images.ygoprodeck.com/images/cards/back_high.jpg';
+        };
+    }
+    element.className = 'rounded-lg shadow-lg w-full hover:shadow-xl cursor-pointer';
+    element.dataset.cardId = card.id;
+    element.addEventListener('click', () => openCardPreview(card.id));
+    return element;
+}
+
+function applyAtlas(atlas) {
+    // Swap the individual card images for tiles of the deck atlas once it has been built
+    deckAtlas = atlas;
+    document.querySelectorAll('img[data-card-id]').forEach(imgElement => {
+        const cardId = Number(imgElement.dataset.cardId);
+        if (atlasTileStyle(cardId)) {
+            imgElement.replaceWith(cardImageElement({ id: cardId, name: imgElement.alt }));
+        }
+    });
+}
+
+function fillCard(card) {
+    // Update every copy of a card rendered from the deck skeleton
+    deckCards[card.id] = card;
+    document.querySelectorAll(`[data-card-id="${card.id}"]`).forEach(element => {
+        if (element.tagName === 'IMG') {
+            element.src = card.image_url || 'https://images.ygoprodeck.com/images/cards/back_high.jpg';
+            element.alt = card.name;
+        } else {
+            // Atlas tiles already show the art
+            element.title = card.name;
+        }
+    });
+}
+
+function renderDeckStats(stats) {
+    const statsContainer = document.getElementById('deckStats');
+    statsContainer.innerHTML = '';
+
+    // Card Count Summary
+    const countSummary = document.createElement('div');
+    countSummary.className = 'bg-gray-800 rounded-lg p-3';
+    countSummary.innerHTML = `
+        <h3 class="font-bold mb-2">Card Count</h3>
+        <div class="grid grid-cols-3 gap-2 text-center">
+            <div class="bg-gray-700 rounded p-2">
+                <div class="text-blue-400 font-bold">${stats.main_deck}</div>
+                <div class="text-xs">Main</div>
+            </div>
+            <div class="bg-gray-700 rounded p-2">
+                <div class="text-purple-400 font-bold">${stats.extra_deck}</div>
+                <div class="text-xs">Extra</div>
+            </div>
+            <div class="bg-gray-700 rounded p-2">
+                <div class="text-green-400 font-bold">${stats.side_deck}</div>
+                <div class="text-xs">Side</div>
+            </div>
+        </div>
+    `;
+    statsContainer.appendChild(countSummary);
+
+    // Card Types Distribution
+    if (stats.card_types && Object.keys(stats.card_types).length > 0) {
+        const cardTypes = document.createElement('div');
+        cardTypes.className = 'bg-gray-800 rounded-lg p-3';
+
+        let cardTypesHTML = '<h3 class="font-bold mb-2">Card Types</h3><div class="space-y-1">';
+
+        const colors = {
+            'Normal Monster': '#f9ca24',
+            'Effect Monster': '#e17055',
+            'Fusion Monster': '#6c5ce7',
+            'Ritual Monster': '#0984e3',
+            'Synchro Monster': '#dfe6e9',
+            'Xyz Monster': '#2d3436',
+            'Pendulum Monster': '#00b894',
+            'Link Monster': '#00cec9',
+            'Spell Card': '#00b894',
+            'Trap Card': '#d63031'
+        };
+
+        for (const [type, count] of Object.entries(stats.card_types)) {
+            const color = colors[type] || '#636e72';
+            cardTypesHTML += `
+                <div class="flex items-center justify-between">
+                    <div class="flex items-center">
+                        <span class="stat-circle" style="background-color: ${color}"></span>
+                        ${type}
+                    </div>
+                    <span class="font-bold">${count}</span>
+                </div>
+            `;
+        }
+
+        cardTypesHTML += '</div>';
+        cardTypes.innerHTML = cardTypesHTML;
+        statsContainer.appendChild(cardTypes);
+    }
+
+    // Attributes Distribution
+    if (stats.attributes && Object.keys(stats.attributes).length > 0) {
+        const attributes = document.createElement('div');
+        attributes.className = 'bg-gray-800 rounded-lg p-3';
+
+        let attributesHTML = '<h3 class="font-bold mb-2">Attributes</h3><div class="space-y-1">';
+
+        const colors = {
+            'DARK': '#2d3436',
+            'LIGHT': '#fdcb6e',
+            'EARTH': '#b33939',
+            'WATER': '#0984e3',
+            'FIRE': '#e17055',
+            'WIND': '#00b894',
+            'DIVINE': '#e84393'
+        };
+
+        for (const [attr, count] of Object.entries(stats.attributes)) {
+            const color = colors[attr] || '#636e72';
+            attributesHTML += `
+                <div class="flex items-center justify-between">
+                    <div class="flex items-center">
+                        <span class="stat-circle" style="background-color: ${color}"></span>
+                        ${attr}
+                    </div>
+                    <span class="font-bold">${count}</span>
+                </div>
+            `;
+        }
+
+        attributesHTML += '</div>';
+        attributes.innerHTML = attributesHTML;
+        statsContainer.appendChild(attributes);
+    }
+
+    // Monster Types Distribution
+    if (stats.monster_types && Object.keys(stats.monster_types).length > 0) {
+        const monsterTypes = document.createElement('div');
+        monsterTypes.className = 'bg-gray-800 rounded-lg p-3';
+
+        let monsterTypesHTML = '<h3 class="font-bold mb-2">Monster Types</h3><div class="space-y-1">';
+
+        for (const [type, count] of Object.entries(stats.monster_types)) {
+            monsterTypesHTML += `
+                <div class="flex items-center justify-between">
+                    <div>${type}</div>
+                    <span class="font-bold">${count}</span>
+                </div>
+            `;
+        }
+
+        monsterTypesHTML += '</div>';
+        monsterTypes.innerHTML = monsterTypesHTML;
+        statsContainer.appendChild(monsterTypes);
+    }
+
+    // Levels/Ranks Distribution
+    if (stats.levels && Object.keys(stats.levels).length > 0) {
+        const levels = document.createElement('div');
+        levels.className = 'bg-gray-800 rounded-lg p-3';
+
+        let levelsHTML = '<h3 class="font-bold mb-2">Levels/Ranks</h3><div class="grid grid-cols-4 gap-2 text-center">';
+
+        for (let i = 1; i <= 12; i++) {
+            const count = stats.levels[i] || 0;
+            const opacity = count > 0 ? 1 : 0.3;
+
+            levelsHTML += `
+                <div class="bg-gray-700 rounded p-1" style="opacity: ${opacity}">
+                    <div class="font-bold">${count}</div>
+                    <div class="text-xs">★${i}</div>
+                </div>
+            `;
+        }
+
+        levelsHTML += '</div>';
+        levels.innerHTML = levelsHTML;
+        statsContainer.appendChild(levels);
+    }
+}
+
+function renderDeck(deck, stats) {
+    // Update card counts
+    document.getElementById('mainCount').textContent = `(${stats.main_deck} cards)`;
+    document.getElementById('extraCount').textContent = `(${stats.extra_deck} cards)`;
+    document.getElementById('sideCount').textContent = `(${stats.side_deck} cards)`;
+
+    // Render each section
+    renderCardSection('mainDeck', deck.main);
+    renderCardSection('extraDeck', deck.extra);
+    renderCardSection('sideDeck', deck.side);
+
+    // Render stats
+    renderDeckStats(stats);
+}
+
+// API Functions
+async function openYDKFile() {
+    showLoading();
+    try {
+        console.log("Opening YDK file...");
+        const filePath = await callApi('open_file_dialog');
+        console.log("File path:", filePath);
+        if (filePath) {
+            const result = await callApi('load_ydk_file', filePath);
+            console.log("Load result:", result);
+            if (result.status === 'success') {
+                noteGeneration(result);
+                await showDeck(result.deck_id);
+            } else {
+                alert('Error: ' + result.message);
+            }
+        }
+    } catch (error) {
+        console.error("Error in openYDKFile:", error);
+        alert('Error opening file: ' + error);
+    }
+    hideLoading();
+}
+
+async function importDeck() {
+    showLoading();
+    try {
+        console.log("Importing deck...");
+        const importText = document.getElementById('importText').value.trim();
+        const format = document.querySelector('input[name="importFormat"]:checked').value;
+        console.log("Format:", format, "Text length:", importText.length);
+
+        let result;
+        if (format === 'ydke') {
+            result = await callApi('load_ydke_url', importText);
+        } else if (format === 'omega') {
+            result = await callApi('load_omega_format', importText);
+        }
+        console.log("Import result:", result);
+
+        if (result && result.status === 'success') {
+            noteGeneration(result);
+            hideImportForm();
+            await showDeck(result.deck_id);
+        } else {
+            alert('Error: ' + (result ? result.message : 'Unknown error'));
+        }
+    } catch (error) {
+        console.error("Error in importDeck:", error);
+        alert('Error importing deck: ' + error);
+    }
+    hideLoading();
+}
+
+// Id of the deck on screen, other open decks are listed as tabs
+let currentDeckId = null;
+
+// Newest generation seen, every deck load and switch starts one
+let deckGeneration = 0;
+
+function noteGeneration(result) {
+    if (result && result.generation > deckGeneration) {
+        deckGeneration = result.generation;
+    }
+}
+
+function isStale(result) {
+    // Results of fetches a newer load or switch superseded never reach the page
+    return !result || result.stale || result.generation < deckGeneration;
+}
+
+async function showDeck(deckId) {
+    // Decks viewed before are already processed and render straight from the memoised payload
+    const deck = await callApi('switch_deck', deckId);
+    if (!deck || deck.status !== 'success') {
+        alert('Error: ' + (deck ? deck.message : 'Unknown error'));
+        await renderDeckTabs();
+        return;
+    }
+    noteGeneration(deck);
+    currentDeckId = deckId;
+    await renderDeckTabs();
+    if (deck.processed) {
+        const info = await callApi('get_deck_info', true, deckId);
+        if (isStale(info)) {
+            return;
+        }
+        if (info.status === 'success') {
+            renderDeckInfo(info);
+            return;
+        }
+    }
+    await loadDeckInfo(deckId);
+}
+
+function renderDeckInfo(info) {
+    deckCards = {};
+    Object.entries(info.cards).forEach(([cardId, card]) => {
+        deckCards[cardId] = { ...card, id: Number(cardId) };
+    });
+    deckAtlas = info.atlas || null;
+    renderDeck(info.deck, info.stats);
+    document.getElementById('noDeckMessage').classList.add('hidden');
+    document.getElementById('deckContent').classList.remove('hidden');
+}
+
+async function renderDeckTabs() {
+    const result = await callApi('list_decks');
+    const container = document.getElementById('deckTabs');
+    container.innerHTML = '';
+    if (!result || result.status !== 'success') {
+        return;
+    }
+
+    result.decks.forEach(deck => {
+        const tab = document.createElement('button');
+        tab.className = 'deck-tab' + (deck.deck_id === currentDeckId ? ' active' : '');
+        tab.title = `${deck.main_deck} main, ${deck.extra_deck} extra, ${deck.side_deck} side`;
+        tab.textContent = deck.name;
+        tab.addEventListener('click', () => {
+            if (deck.deck_id !== currentDeckId) {
+                showDeck(deck.deck_id);
+            }
+        });
+
+        const close = document.createElement('i');
+        close.className = 'fas fa-times deck-tab-close';
+        close.addEventListener('click', event => {
+            event.stopPropagation();
+            closeDeck(deck.deck_id);
+        });
+        tab.appendChild(close);
+        container.appendChild(tab);
+    });
+}
+
+async function closeDeck(deckId) {
+    const result = await callApi('close_deck', deckId);
+    if (!result || result.status !== 'success') {
+        await renderDeckTabs();
+        return;
+    }
+    noteGeneration(result);
+    if (deckId !== currentDeckId) {
+        await renderDeckTabs();
+    } else if (result.active) {
+        await showDeck(result.active);
+    } else {
+        currentDeckId = null;
+        await renderDeckTabs();
+        document.getElementById('deckContent').classList.add('hidden');
+        document.getElementById('noDeckMessage').classList.remove('hidden');
+    }
+}
+
+async function loadDeckInfo(deckId) {
+    showLoading();
+    try {
+        console.log("Loading deck info...");
+        const skeleton = await callApi('start_deck_load', true, deckId);
+        console.log("Deck skeleton:", skeleton);
+
+        if (skeleton && skeleton.status === 'success') {
+            if (isStale(skeleton)) {
+                // Another deck was opened meanwhile
+                hideLoading();
+                return;
+            }
+            deckCards = {};
+            deckAtlas = skeleton.atlas || null;
+            renderDeck(skeleton.deck, skeleton.stats);
+            document.getElementById('noDeckMessage').classList.add('hidden');
+            document.getElementById('deckContent').classList.remove('hidden');
+            hideLoading();
+            await pollDeckProgress(skeleton.load_id);
+        } else {
+            const message = skeleton && skeleton.message ? skeleton.message : 'Failed to load deck information';
+            alert('Error: ' + message);
+        }
+    } catch (error) {
+        console.error("Error in loadDeckInfo:", error);
+        alert('Error loading deck info: ' + error);
+    }
+    hideLoading();
+}
+
+async function pollDeckProgress(loadId) {
+    let cursor = 0;
+    let finished = false;
+    while (true) {
+        const progress = await callApi('get_deck_progress', loadId, cursor);
+        if (!progress || progress.status !== 'success' || progress.deck_id !== currentDeckId || isStale(progress)) {
+            // A newer load replaced this one
+            return;
+        }
+
+        progress.cards.forEach(fillCard);
+        cursor = progress.cursor;
+
+        if (progress.done && !finished) {
+            finished = true;
+            if (progress.stats) {
+                renderDeckStats(progress.stats);
+            }
+            // The deck is now processed, switching back to it skips the load
+            renderDeckTabs();
+            if (progress.error) {
+                alert('Error loading deck info: ' + progress.error);
+            } else if (progress.missing && progress.missing.length > 0) {
+                alert(progress.missing.length + ' card(s) could not be loaded in time, reload the deck to retry.');
+            }
+        }
+        if (progress.atlas && !deckAtlas) {
+            applyAtlas(progress.atlas);
+        }
+        // The atlas waits for every image, it can arrive after the stats
+        if (progress.done && !progress.atlas_pending) {
+            return;
+        }
+        await new Promise(resolve => setTimeout(resolve, finished ? 250 : 100));
+    }
+}
+
+async function copyCardmarketWantsList() {
+    showLoading();
+    try {
+        // The wants list is built from the deck already processed for display
+        const wantsList = await callApi('get_wants_list', 'cardmarket', currentDeckId);
+
+        if (wantsList.status !== 'success') {
+            alert('Error: ' + wantsList.message);
+            hideLoading();
+            return;
+        }
+
+        const content = wantsList.text;
+
+        // Copy the content to the clipboard
+        await navigator.clipboard.writeText(content);
+        alert('CardMarket wants list copied to clipboard!');
+    } catch (error) {
+        console.error("Error in copyCardmarketWantsList:", error);
+        alert('Error copying CardMarket wants list: ' + error);
+    } finally {
+        hideLoading();
+    }
+}
+
+// Metrics debug panel, toggled with Ctrl+Shift+M
+let metricsTimer = null;
+let metricsWereEnabled = false;
+
+function formatMs(value) {
+    return value === null || value === undefined ? '-' : value.toFixed(1);
+}
+
+function metricsTable(headers, rows) {
+    const table = document.createElement('table');
+    const head = table.insertRow();
+    headers.forEach(header => {
+        const cell = document.createElement('th');
+        cell.textContent = header;
+        head.appendChild(cell);
+    });
+    rows.forEach(row => {
+        const tableRow = table.insertRow();
+        row.forEach(value => {
+            tableRow.insertCell().textContent = value;
+        });
+    });
+    return table;
+}
+
+function metricsSection(container, title, table) {
+    const heading = document.createElement('h3');
+    heading.textContent = title;
+    container.appendChild(heading);
+    container.appendChild(table);
+}
+
+function renderMetricsPanel(report) {
+    const container = document.getElementById('metricsContent');
+    container.innerHTML = '';
+
+    const histograms = report.histograms || {};
+    metricsSection(container, 'Stages and HTTP latency (ms)', metricsTable(
+        ['name', 'count', 'mean', 'p50', 'p99', 'max'],
+        Object.entries(histograms).map(([name, h]) =>
+            [name, h.count, formatMs(h.mean_ms), formatMs(h.p50_ms), formatMs(h.p99_ms), formatMs(h.max_ms)])
+    ));
+
+    // Bridge overhead is the JavaScript round trip minus the time Python spent in the call
+    metricsSection(container, 'Bridge round trips (ms)', metricsTable(
+        ['method', 'calls', 'mean', 'python', 'bridge', 'max'],
+        Object.entries(bridgeTimings).map(([method, timing]) => {
+            const mean = timing.total / timing.count;
+            const python = histograms['api.' + method];
+            const pythonMean = python ? python.mean_ms : null;
+            const bridge = pythonMean === null ? null : mean - pythonMean;
+            return [method, timing.count, formatMs(mean), formatMs(pythonMean), formatMs(bridge),
+                    formatMs(timing.max)];
+        })
+    ));
+
+    const counters = Object.entries(report.counters || {});
+    ['card_cache', 'scheduler', 'image_cache'].forEach(source => {
+        Object.entries(report[source] || {}).forEach(([name, value]) => {
+            if (typeof value === 'number') {
+                counters.push([source + '.' + name, value]);
+            }
+        });
+    });
+    metricsSection(container, 'Counters', metricsTable(['name', 'value'], counters));
+}
+
+async function refreshMetricsPanel() {
+    const report = await callApi('get_metrics');
+    if (report && report.status === 'success') {
+        renderMetricsPanel(report);
+    }
+}
+
+async function toggleMetricsPanel() {
+    const panel = document.getElementById('metricsPanel');
+    debugMetrics = panel.classList.contains('hidden');
+    panel.classList.toggle('hidden', !debugMetrics);
+    clearInterval(metricsTimer);
+    if (!debugMetrics) {
+        // Leave metrics recording if they were on before the panel was opened
+        await callApi('set_metrics_enabled', metricsWereEnabled);
+    } else {
+        const result = await callApi('set_metrics_enabled', true);
+        metricsWereEnabled = result.was_enabled;
+        await refreshMetricsPanel();
+        metricsTimer = setInterval(refreshMetricsPanel, 1000);
+    }
+}
+
+async function resetMetrics() {
+    bridgeTimings = {};
+    await callApi('reset_metrics');
+    await refreshMetricsPanel();
+}
+
+async function dumpMetrics() {
+    const result = await callApi('dump_metrics');
+    if (result && result.status === 'success') {
+        alert('Metrics written to ' + result.path);
+    } else {
+        alert('Error: ' + (result ? result.message : 'Unknown error'));
+    }
+}
+
+// Initialize when DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+    console.log("DOM loaded, initializing...");
+
+    // Setup basic navigation buttons
+    document.getElementById('openYDKBtn').addEventListener('click', openYDKFile);
+    document.getElementById('openYDKBtnAlt').addEventListener('click', openYDKFile);
+    document.getElementById('showImportFormBtn').addEventListener('click', showImportForm);
+    document.getElementById('showImportFormBtnAlt').addEventListener('click', showImportForm);
+    document.getElementById('closeImportBtn').addEventListener('click', hideImportForm);
+    document.getElementById('importDeckBtn').addEventListener('click', importDeck);
+
+    // Setup copy button
+    const copyBtn = document.getElementById('downloadCardmarketBtn');
+    if (copyBtn) {
+        copyBtn.addEventListener('click', copyCardmarketWantsList);
+    }
+
+    // Setup the metrics debug panel
+    document.getElementById('resetMetricsBtn').addEventListener('click', resetMetrics);
+    document.getElementById('dumpMetricsBtn').addEventListener('click', dumpMetrics);
+    document.getElementById('closeMetricsBtn').addEventListener('click', toggleMetricsPanel);
+    document.addEventListener('keydown', event => {
+        if (event.ctrlKey && event.shiftKey && event.key.toLowerCase() === 'm') {
+            event.preventDefault();
+            toggleMetricsPanel();
+        }
+    });
+
+    console.log('Event listeners initialized successfully');
+});
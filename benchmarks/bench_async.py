@@ -0,0 +1,119 @@
+"""Many concurrent deck loads through the asyncio card service against a local asyncio stand-in server
+
+Compares loading --decks decks at once with one thread per load on the blocking card service
+against one event loop on the async card service, checks both resolve to the same cards and
+placeholders, and cancels a load midway to show its outstanding requests stop. Needs aiohttp.
+Run from the repository root:
+    python -m benchmarks.bench_async
+    python -m benchmarks.bench_async --decks 500 --latency 0.1
+"""
+import argparse
+import asyncio
+import random
+import sys
+import threading
+import time
+
+from app import async_card_service, card_service
+from benchmarks.fake_api import UNKNOWN_PASSCODE_START, AsyncFakeCardInfoServer
+from benchmarks.run import DECK_SIZES, generate_deck
+
+
+def threaded_loads(decks):
+    """Load every deck on its own thread with the blocking card service"""
+    threads = [threading.Thread(target=card_service.fetch_card_details_many, args=(deck.all_ids().tolist(),))
+               for deck in decks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+async def async_loads(decks):
+    """Load every deck as a task on one event loop with the async card service"""
+    try:
+        await asyncio.gather(*(async_card_service.fetch_card_details_many_async(deck.all_ids().tolist())
+                               for deck in decks))
+    finally:
+        await async_card_service.close()
+
+
+def timed(server, func, *args):
+    """Seconds, upstream requests and peak requests in flight of a cold run of func"""
+    card_service.card_cache.clear()
+    server.request_count = server.max_in_flight = 0
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start, server.request_count, server.max_in_flight
+
+
+async def same_cards(card_ids):
+    """Whether the async card service returns the same records and placeholders as the blocking one"""
+    try:
+        card_service.card_cache.clear()
+        blocking = card_service.fetch_card_details_many(card_ids)
+        card_service.card_cache.clear()
+        resolved = await async_card_service.fetch_card_details_many_async(card_ids)
+        single = await async_card_service.fetch_card_details_async(card_ids[0])
+        return resolved == blocking and single == blocking[card_ids[0]]
+    finally:
+        await async_card_service.close()
+
+
+async def cancelled_load(server, deck, cancel_after):
+    """Cancel a load after cancel_after seconds, returns (requests sent before, requests sent after, cards cached)"""
+    card_service.card_cache.clear()
+    server.request_count = 0
+    try:
+        task = asyncio.ensure_future(async_card_service.fetch_card_details_many_async(deck.all_ids().tolist(),
+                                                                                      chunk_size=1))
+        await asyncio.sleep(cancel_after)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        sent = server.request_count
+        await asyncio.sleep(server.latency * 2)
+        cached = len(card_service.card_cache.get_many(deck.all_ids().tolist()))
+        return sent, server.request_count - sent, cached
+    finally:
+        await async_card_service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decks', type=int, default=200, help='deck loads to run at once')
+    parser.add_argument('--latency', type=float, default=0.05, help='injected server latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=async_card_service.MAX_CONCURRENCY,
+                        help='requests in flight at once on each side')
+    parser.add_argument('--rate-limit', type=float, default=1000,
+                        help='client request rate limit, high by default so it does not dominate the timings')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    decks = [generate_deck(rng, DECK_SIZES['standard']) for _ in range(args.decks)]
+    card_service.configure_fetcher(max_workers=args.concurrency, rate_limit=args.rate_limit)
+    async_card_service.MAX_CONCURRENCY = args.concurrency
+
+    with AsyncFakeCardInfoServer(latency=args.latency) as server:
+        card_service.API_URL = server.url
+        threaded = timed(server, threaded_loads, decks)
+        multiplexed = timed(server, lambda: asyncio.run(async_loads(decks)))
+        card_ids = decks[0].all_ids().tolist() + [UNKNOWN_PASSCODE_START + 1, UNKNOWN_PASSCODE_START + 2]
+        consistent = asyncio.run(same_cards(card_ids))
+        sent, after_cancel, cached = asyncio.run(cancelled_load(server, decks[1], args.latency * 1.5))
+
+    print(f"{args.decks} deck loads, {args.latency * 1000:.0f}ms latency, "
+          f"{args.concurrency} requests in flight at most")
+    for label, (seconds, requests, peak) in (('threads', threaded), ('asyncio', multiplexed)):
+        print(f"{label}:  {seconds:.3f}s, {requests} requests, {peak} in flight at peak")
+    print(f"same cards and placeholders: {'yes' if consistent else 'NO'}")
+    print(f"cancelled load: {sent} requests sent, {after_cancel} after cancelling, "
+          f"{cached} of {len(set(decks[1].all_ids().tolist()))} cards cached")
+    sys.exit(0 if consistent and not after_cancel else 1)
+
+
+if __name__ == '__main__':
+    main()
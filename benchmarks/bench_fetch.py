@@ -0,0 +1,44 @@
+"""Cold-load wall time of card fetching against a local server with injected latency
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch
+"""
+import argparse
+import time
+
+from app import card_service
+from benchmarks.fake_api import FakeCardInfoServer
+
+
+def cold_load(card_ids, max_workers, rate_limit):
+    card_service.card_cache.clear()
+    card_service.configure_fetcher(max_workers=max_workers, rate_limit=rate_limit)
+    start = time.perf_counter()
+    # One request per card, so only the worker pool can hide the latency
+    card_service.fetch_card_details_many(card_ids, chunk_size=1)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cards', type=int, default=48, help='number of unique cards to load')
+    parser.add_argument('--latency', type=float, default=0.05, help='injected server latency in seconds')
+    parser.add_argument('--workers', type=int, default=8, help='concurrency to compare against serial')
+    parser.add_argument('--rate-limit', type=float, default=1000,
+                        help='requests per second for both runs, at the real 15/s both are rate bound')
+    args = parser.parse_args()
+
+    card_ids = list(range(1000, 1000 + args.cards))
+    with FakeCardInfoServer(latency=args.latency) as server:
+        card_service.API_URL = server.url
+        serial = cold_load(card_ids, max_workers=1, rate_limit=args.rate_limit)
+        parallel = cold_load(card_ids, max_workers=args.workers, rate_limit=args.rate_limit)
+
+    print(f"serial:   {serial:.3f}s ({args.cards} cards, {args.latency * 1000:.0f}ms latency, "
+          f"{args.rate_limit:g} requests/s)")
+    print(f"parallel: {parallel:.3f}s ({args.workers} workers)")
+    print(f"speedup:  {serial / parallel:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
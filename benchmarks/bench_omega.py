@@ -0,0 +1,79 @@
+"""Omega format decoding throughput on large synthetic payloads, against the previous struct decoder
+
+Run from the repository root:
+    python -m benchmarks.bench_omega
+"""
+import argparse
+import base64
+import random
+import struct
+import time
+import zlib
+
+from app.deck_parser import FormatDecodeException, OmegaFormatDecoder, OmegaFormatEncoder
+
+
+class StructOmegaFormatDecoder:
+    """The decoder OmegaFormatDecoder replaced, re-slicing the payload after every read"""
+
+    def decode(self, encoded):
+        raw = zlib.decompress(base64.b64decode(encoded.strip()), -zlib.MAX_WBITS)
+        main_and_extra_count, raw = self.unpack('B', raw)
+        side_count, raw = self.unpack('B', raw)
+        deck_list = {"main": [], "extra": [], "side": []}
+        for _ in range(main_and_extra_count):
+            code, raw = self.unpack('I', raw)
+            if len(deck_list["main"]) < 40:
+                deck_list["main"].append(code)
+            else:
+                deck_list["extra"].append(code)
+        for _ in range(side_count):
+            code, raw = self.unpack('I', raw)
+            deck_list["side"].append(code)
+        return deck_list
+
+    def unpack(self, format, data):
+        size = struct.calcsize(format)
+        unpacked = struct.unpack(format, data[:size])
+        if not unpacked:
+            raise FormatDecodeException("unexpected end of input")
+        return unpacked[0], data[size:]
+
+
+def synthetic_deck(rng, main_and_extra, side):
+    codes = [rng.randrange(1, 2 ** 32) for _ in range(main_and_extra + side)]
+    return {"main": codes[:min(main_and_extra, 40)], "extra": codes[40:main_and_extra],
+            "side": codes[main_and_extra:]}
+
+
+def timed(func, items):
+    start = time.perf_counter()
+    func(items)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--decks', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    decoder, encoder, old_decoder = OmegaFormatDecoder(), OmegaFormatEncoder(), StructOmegaFormatDecoder()
+
+    for label, main_and_extra, side in [("standard", 55, 15), ("max size", 255, 255)]:
+        decks = [synthetic_deck(rng, main_and_extra, side) for _ in range(args.decks)]
+        encode_time = timed(encoder.encode_many, decks)
+        encoded = encoder.encode_many(decks)
+        assert [deck.to_dict() for deck in decoder.decode_many(encoded)] == decks
+        assert [old_decoder.decode(item) for item in encoded] == decks
+
+        before = timed(lambda items: [old_decoder.decode(item) for item in items], encoded)
+        after = timed(decoder.decode_many, encoded)
+        print(f"{label} ({main_and_extra}+{side} cards):")
+        print(f"  struct decode: {args.decks / before:9.0f} decks/s")
+        print(f"  numpy decode:  {args.decks / after:9.0f} decks/s ({before / after:.1f}x)")
+        print(f"  encode:        {args.decks / encode_time:9.0f} decks/s")
+
+
+if __name__ == '__main__':
+    main()
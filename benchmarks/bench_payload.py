@@ -0,0 +1,65 @@
+"""Size and JSON round-trip time of the get_deck_info payload, full against compact
+
+pywebview hands API results to the page as JSON, so the time to serialise and parse the
+payload stands in for the bridge latency. Run from the repository root:
+    python -m benchmarks.bench_payload
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app import card_service
+from app.api import DeckViewerAPI
+from app.deck_parser import Deck
+from benchmarks.fake_api import fake_card
+
+
+def large_deck(rng, pool, main, extra, side):
+    """A deck of mostly single copies where half of the side deck also appears in the main deck"""
+    main_ids = rng.choice(pool, size=main, replace=False)
+    extra_ids = rng.choice(pool, size=extra, replace=False)
+    side_ids = np.concatenate([main_ids[:side // 2], rng.choice(pool, size=side - side // 2, replace=False)])
+    cards = np.concatenate([main_ids, extra_ids, side_ids]).astype(np.uint32)
+    return Deck.from_buffer(cards, main, extra)
+
+
+def round_trip(payload, repeat):
+    """Seconds per json.dumps + json.loads of payload"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(json.dumps(payload))
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pool = np.arange(10000, 20000)
+    for card_id in pool.tolist():
+        card_service.card_cache.put(card_id, card_service._build_card(fake_card(card_id)))
+
+    api = DeckViewerAPI()
+    for label, sizes in (("standard 60/15/15", (60, 15, 15)), ("large 200/30/60", (200, 30, 60)),
+                         ("cube 540/0/0", (540, 0, 0))):
+        api.deck = large_deck(rng, pool, *sizes)
+
+        full = api.get_deck_info()
+        compact = api.get_deck_info(compact=True)
+        full_size = len(json.dumps(full))
+        compact_size = len(json.dumps(compact))
+        full_time = round_trip(full, args.repeat)
+        compact_time = round_trip(compact, args.repeat)
+
+        print(f"{label}:")
+        print(f"  full:    {full_size:8d} bytes {full_time * 1e3:7.2f} ms")
+        print(f"  compact: {compact_size:8d} bytes {compact_time * 1e3:7.2f} ms "
+              f"({full_size / compact_size:.1f}x smaller, {full_time / compact_time:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Launch latency: import time of the app and time until the window has loaded its page
+
+Every measurement runs in a fresh interpreter. Run from the repository root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --window          # also open the window (needs a display)
+    python -m benchmarks.bench_startup --max-import-ms 150   # exit with status 1 above the budget, for CI
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules that must not be imported while the app starts
+DEFERRED_MODULES = ("numpy", "requests")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = [name for name in {deferred!r}
+          if name in sys.modules and type(sys.modules[name]).__name__ != "_LazyModule"]
+print(json.dumps({{"import_ms": elapsed * 1e3, "eager_modules": loaded}}))
+"""
+
+WINDOW_PROBE = """
+import webview
+import main
+
+window = main.create_window()
+
+def loaded():
+    print("ready", flush=True)
+    window.destroy()
+
+window.events.loaded += loaded
+webview.start()
+"""
+
+
+def probe_import():
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(deferred=DEFERRED_MODULES)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def probe_window(timeout):
+    """Seconds from spawning the interpreter until the page's loaded event"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", WINDOW_PROBE], stdout=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            if line.strip() == "ready":
+                return time.perf_counter() - start
+    finally:
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    raise RuntimeError("The window never reported ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--window', action='store_true', help='also measure time-to-window-ready')
+    parser.add_argument('--max-import-ms', type=float, help='fail when the median import time exceeds this')
+    args = parser.parse_args()
+
+    results = [probe_import() for _ in range(args.repeat)]
+    import_ms = statistics.median(result["import_ms"] for result in results)
+    eager = sorted({name for result in results for name in result["eager_modules"]})
+    print(f"import main:     {import_ms:8.1f} ms (median of {args.repeat})")
+    if eager:
+        print(f"eagerly imported: {', '.join(eager)}")
+
+    if args.window:
+        ready = statistics.median(probe_window(timeout=30) for _ in range(args.repeat))
+        print(f"window ready:    {ready * 1e3:8.1f} ms (median of {args.repeat}, including interpreter start)")
+
+    failed = bool(eager)
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"import time over budget of {args.max_import_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""get_deck_stats throughput on cached cards, against the previous per-copy Counter implementation
+
+Run from the repository root:
+    python -m benchmarks.bench_stats
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from app import card_service
+from benchmarks.fake_api import fake_card
+
+
+def counter_deck_stats(deck, get_card_details_func):
+    """The per-copy Counter implementation get_deck_stats replaced"""
+    stats = {}
+    card_types = Counter()
+    attributes = Counter()
+    monster_types = Counter()
+    levels = Counter()
+
+    for section in ["main", "extra", "side"]:
+        for card_id in deck[section]:
+            card = get_card_details_func(card_id)
+            if card.type:
+                card_types[card.type] += 1
+            if 'Monster' in card.type:
+                if card.attribute:
+                    attributes[card.attribute] += 1
+                if card.race:
+                    monster_types[card.race] += 1
+                if card.level:
+                    levels[card.level] += 1
+
+    if card_types:
+        stats['card_types'] = dict(card_types)
+    if attributes:
+        stats['attributes'] = dict(attributes)
+    if monster_types:
+        stats['monster_types'] = dict(monster_types)
+    if levels:
+        stats['levels'] = dict(levels)
+    return stats
+
+
+def random_deck(rng, pool):
+    """A deck of 40-60 main, 15 extra and 15 side cards with up to three copies each"""
+    def section(size):
+        cards = []
+        while len(cards) < size:
+            cards += [rng.choice(pool)] * rng.randint(1, 3)
+        return cards[:size]
+    return {"main": section(rng.randint(40, 60)), "extra": section(15), "side": section(15)}
+
+
+def run(stats_func, decks, **kwargs):
+    start = time.perf_counter()
+    for deck in decks:
+        stats_func(deck, card_service.fetch_card_details, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--decks', type=int, default=2000)
+    parser.add_argument('--pool', type=int, default=3000, help='number of distinct cards')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = list(range(10000, 10000 + args.pool))
+    for card_id in pool:
+        card_service.card_cache.put(card_id, card_service._build_card(fake_card(card_id)))
+    decks = [random_deck(rng, pool) for _ in range(args.decks)]
+
+    expected = [counter_deck_stats(deck, card_service.fetch_card_details) for deck in decks]
+    for deck, deck_stats in zip(decks[:50], expected):
+        assert card_service.get_deck_stats(deck, card_service.fetch_card_details, prefetch_func=None) == deck_stats
+    assert card_service.get_deck_stats_many(decks, card_service.fetch_card_details, prefetch_func=None) == expected
+
+    before = run(counter_deck_stats, decks)
+    single = run(card_service.get_deck_stats, decks, prefetch_func=None)
+    start = time.perf_counter()
+    card_service.get_deck_stats_many(decks, card_service.fetch_card_details, prefetch_func=None)
+    batched = time.perf_counter() - start
+
+    print(f"counter:         {args.decks / before:10.0f} decks/s")
+    print(f"get_deck_stats:  {args.decks / single:10.0f} decks/s ({before / single:.1f}x)")
+    print(f"get_deck_stats_many: {args.decks / batched:6.0f} decks/s ({before / batched:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
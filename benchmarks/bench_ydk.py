@@ -0,0 +1,104 @@
+"""YDK parsing throughput in files per second, against the previous line-by-line text parser
+
+Run from the repository root:
+    python -m benchmarks.bench_ydk
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.deck_parser import parse_ydk_bytes, parse_ydk_file
+
+
+def text_parse_ydk_file(file_path):
+    """The line-by-line parser parse_ydk_file replaced, without its console print"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return text_parse_ydk_lines(f)
+
+
+def text_parse_ydk_lines(lines):
+    """The parsing loop of the text parser, over any iterable of lines"""
+    deck = {"main": [], "extra": [], "side": []}
+    current_section = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if line == "#main":
+                current_section = "main"
+            elif line == "#extra":
+                current_section = "extra"
+            continue
+        if line == "!side":
+            current_section = "side"
+            continue
+        if current_section is None:
+            continue
+        try:
+            deck[current_section].append(int(line))
+        except ValueError:
+            pass
+
+    return deck
+
+
+def write_ydk_files(directory, count, rng):
+    """Write synthetic YDK files with comments, blank lines, CRLF endings and, in some, junk lines"""
+    paths = []
+    for index in range(count):
+        newline = "\r\n" if index % 3 == 0 else "\n"
+        lines = ["#created by benchmark", "junk before main", "#main"]
+        lines += [str(rng.randrange(10 ** 7, 10 ** 8)) for _ in range(rng.randint(40, 60))]
+        lines += ["", "not a passcode"] if index % 10 == 0 else [""]
+        lines += ["#extra"]
+        lines += [f"  {rng.randrange(10 ** 7, 10 ** 8)} " for _ in range(15)]
+        lines += ["!side"] + [str(rng.randrange(10 ** 7, 10 ** 8)) for _ in range(15)]
+        path = os.path.join(directory, f"deck{index}.ydk")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(newline.join(lines) + newline)
+        paths.append(path)
+    return paths
+
+
+def files_per_second(func, paths):
+    start = time.perf_counter()
+    func(paths)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_ydk_files(directory, args.files, random.Random(0))
+
+        for path in paths:
+            assert parse_ydk_file(path, verbose=False).to_dict() == text_parse_ydk_file(path)
+
+        before = files_per_second(lambda items: [text_parse_ydk_file(path) for path in items], paths)
+        single = files_per_second(lambda items: [parse_ydk_file(path, verbose=False) for path in items], paths)
+
+        # Parsing alone, with the files already in memory
+        contents = []
+        for path in paths:
+            with open(path, "rb") as f:
+                contents.append(f.read())
+        texts = [content.decode("utf-8").splitlines() for content in contents]
+        text_memory = files_per_second(lambda items: [text_parse_ydk_lines(lines) for lines in items], texts)
+        bytes_memory = files_per_second(lambda items: [parse_ydk_bytes(data) for data in items], contents)
+
+    print(f"text parser:     {before:8.0f} files/s")
+    print(f"parse_ydk_file:  {single:8.0f} files/s ({single / before:.1f}x)")
+    print("in memory:")
+    print(f"text parser:     {text_memory:8.0f} files/s")
+    print(f"parse_ydk_bytes: {bytes_memory:8.0f} files/s ({bytes_memory / text_memory:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""Local stand-ins for the YGOProDeck cardinfo.php endpoint used by the benchmarks"""
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+CARD_TYPES = ['Effect Monster', 'Spell Card', 'Trap Card', 'Normal Monster', 'Fusion Monster',
+              'Synchro Monster', 'Xyz Monster', 'Link Monster']
+ATTRIBUTES = ['DARK', 'LIGHT', 'EARTH', 'WATER', 'FIRE', 'WIND']
+RACES = ['Spellcaster', 'Dragon', 'Warrior', 'Fiend', 'Machine', 'Zombie']
+
+# Passcodes at or above this value are answered as "not found"
+UNKNOWN_PASSCODE_START = 90000000
+
+
+def fake_card(card_id):
+    """Build a deterministic cardinfo.php entry for a passcode"""
+    card_type = CARD_TYPES[card_id % len(CARD_TYPES)]
+    card = {
+        'id': card_id,
+        'name': f'Fake Card {card_id}',
+        'type': card_type,
+        'desc': f'Description of fake card {card_id}. ' * 8,
+        'card_images': [{
+            'id': card_id,
+            'image_url': f'https://images.ygoprodeck.com/images/cards/{card_id}.jpg',
+            'image_url_cropped': f'https://images.ygoprodeck.com/images/cards_cropped/{card_id}.jpg'
+        }]
+    }
+    if 'Monster' in card_type:
+        card['atk'] = (card_id % 31) * 100
+        card['def'] = (card_id % 29) * 100
+        card['level'] = card_id % 12 + 1
+        card['attribute'] = ATTRIBUTES[card_id % len(ATTRIBUTES)]
+        card['race'] = RACES[card_id % len(RACES)]
+    return card
+
+
+def requested_passcodes(path):
+    """Passcodes asked for by a cardinfo.php?id=... request path"""
+    query = parse_qs(urlparse(path).query)
+    return [int(part) for part in query.get('id', [''])[0].split(',') if part]
+
+
+def cardinfo_response(path):
+    """Status and JSON body cardinfo.php would answer a request for path with"""
+    ids = requested_passcodes(path)
+    cards = [fake_card(card_id) for card_id in ids if card_id < UNKNOWN_PASSCODE_START]
+
+    if cards:
+        status, payload = 200, {'data': cards}
+    else:
+        status, payload = 400, {'error': 'No card matching your query was found in the database.'}
+    return status, json.dumps(payload).encode('utf-8')
+
+
+class FakeCardInfoServer:
+    """Threaded HTTP server answering cardinfo.php?id=... with injected latency and failures
+
+    error_rate and throttle_rate are the fractions of requests answered with a 503 and a 429.
+    stall_rate is the fraction held for stall_time seconds before the answer, long enough for a
+    client read timeout, and reset_rate the fraction whose connection is reset without an answer.
+    passcode_counts counts how often each passcode was asked for, failure_counts each failure
+    (503, 429, 'stall' and 'reset').
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, throttle_rate=0.0, stall_rate=0.0, reset_rate=0.0,
+                 stall_time=5.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.stall_rate = stall_rate
+        self.reset_rate = reset_rate
+        self.stall_time = stall_time
+        self.request_count = 0
+        self.failure_count = 0
+        self.failure_counts = Counter()
+        self.passcode_counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}/api/v7/cardinfo.php'
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes, don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.request_count += 1
+                    fake.passcode_counts.update(requested_passcodes(self.path))
+                    roll = fake._random.random()
+                    failure = None
+                    for failure, rate in ((503, fake.error_rate), (429, fake.throttle_rate),
+                                          ('stall', fake.stall_rate), ('reset', fake.reset_rate)):
+                        if roll < rate:
+                            break
+                        roll -= rate
+                    else:
+                        failure = None
+                    if failure:
+                        fake.failure_count += 1
+                        fake.failure_counts[failure] += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                if failure == 'reset':
+                    # Abort the connection, the client sees a reset instead of an answer
+                    self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                    self.connection.close()
+                    self.close_connection = True
+                    return
+                if failure == 'stall':
+                    # Answer late, by then the client has usually timed out and closed the connection
+                    time.sleep(fake.stall_time)
+                    self.close_connection = True
+                    try:
+                        self._answer(*cardinfo_response(self.path))
+                    except ConnectionError:
+                        pass
+                    return
+
+                if failure:
+                    self.send_response(failure)
+                    if failure == 429:
+                        self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                self._answer(*cardinfo_response(self.path))
+
+            def _answer(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class AsyncFakeCardInfoServer:
+    """asyncio HTTP/1.1 server answering cardinfo.php?id=... with injected latency, on its own event loop thread
+
+    Latency is awaited rather than slept, so hundreds of slow requests can be outstanding at
+    once. in_flight and max_in_flight count the requests being answered.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._connections = set()
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._serve, '127.0.0.1', 0))
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/api/v7/cardinfo.php'
+
+    async def _serve(self, reader, writer):
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                # Skip the headers, requests carry no body
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+
+                self.request_count += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    status, body = cardinfo_response(request_line.split()[1].decode('ascii'))
+                finally:
+                    self.in_flight -= 1
+
+                reason = 'OK' if status == 200 else 'Bad Request'
+                writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                             f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii') + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,161 @@
+"""Load test of the HTTP deck service (app.server) against the local fake card API
+
+Starts the fake cardinfo.php server in this process and app.server in a subprocess, then has
+--clients threads each open a session and, for --duration seconds, load generated decks and
+request their info. Reports requests per second and latency percentiles. Run from the
+repository root:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --clients 32 --duration 20 --load-ratio 0.2
+"""
+import argparse
+import gzip
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from benchmarks.fake_api import FakeCardInfoServer
+from benchmarks.run import DECK_SIZES, generate_deck, to_ydke
+
+
+class Client:
+    """One keep-alive connection and session against the deck service"""
+
+    def __init__(self, url, use_gzip=True):
+        address = urlparse(url)
+        self.connection = http.client.HTTPConnection(address.hostname, address.port, timeout=60)
+        self.use_gzip = use_gzip
+        self.session_id = None
+        self.bytes_received = 0
+
+    def call(self, method, **arguments):
+        """POST one API call, returns the decoded result"""
+        headers = {"Content-Type": "application/json"}
+        if self.use_gzip:
+            headers["Accept-Encoding"] = "gzip"
+        if self.session_id:
+            headers["X-Session-Id"] = self.session_id
+        self.connection.request("POST", f"/api/{method}", body=json.dumps(arguments), headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        self.bytes_received += len(body)
+        self.session_id = response.getheader("X-Session-Id", self.session_id)
+        if response.getheader("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        result = json.loads(body)
+        if response.status != 200 or result.get("status") != "success":
+            raise RuntimeError(f"{method} failed with {response.status}: {result.get('message')}")
+        return result
+
+    def close(self):
+        self.connection.close()
+
+
+def run_client(url, seed, deadline, load_ratio, use_gzip, results):
+    """Load decks and request their info until deadline, appending (operation, seconds, ok) to results"""
+    rng = random.Random(seed)
+    client = Client(url, use_gzip)
+    deck_ids = []
+    samples = []
+    try:
+        while time.perf_counter() < deadline:
+            if not deck_ids or rng.random() < load_ratio:
+                operation = "load_ydke_url"
+                arguments = {"ydke_url": to_ydke(generate_deck(rng, DECK_SIZES[rng.choice(["standard", "full"])]))}
+            else:
+                operation = "get_deck_info"
+                arguments = {"compact": rng.random() < 0.8, "deck_id": rng.choice(deck_ids)}
+
+            start = time.perf_counter()
+            try:
+                result = client.call(operation, **arguments)
+                ok = True
+            except Exception as e:
+                print(f"Error in {operation}: {e}", file=sys.stderr)
+                result, ok = None, False
+            samples.append((operation, time.perf_counter() - start, ok))
+
+            if ok and operation == "load_ydke_url":
+                deck_ids.append(result["deck_id"])
+    finally:
+        client.close()
+        results.append((samples, client.bytes_received))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def start_server(api_url, workers):
+    """Start app.server in a subprocess on a free port, returns the process and its URL"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--port", "0", "--workers", str(workers), "--api-url", api_url,
+         "--rate-limit", "1000", "--store", "", "--catalogue", ""],
+        stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "http://" not in line:
+        process.kill()
+        raise RuntimeError(f"The deck service did not start: {line!r}")
+    return process, line.strip().split()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients, one session each")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--load-ratio", type=float, default=0.1,
+                        help="fraction of requests that load a new deck rather than fetch deck info")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake card API latency per request in seconds")
+    parser.add_argument("--no-gzip", action="store_true", help="do not ask for gzipped responses")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with FakeCardInfoServer(latency=args.latency, seed=args.seed) as card_api:
+        process, url = start_server(card_api.url, workers=max(args.clients, 8))
+        try:
+            results = []
+            deadline = time.perf_counter() + args.duration
+            threads = [threading.Thread(target=run_client,
+                                        args=(url, args.seed + index, deadline, args.load_ratio, not args.no_gzip,
+                                              results))
+                       for index in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+        upstream_requests = card_api.request_count
+
+    latencies = defaultdict(list)
+    errors = 0
+    for samples, _ in results:
+        for operation, seconds, ok in samples:
+            latencies[operation].append(seconds * 1e3)
+            errors += not ok
+    total = sum(len(values) for values in latencies.values())
+    received = sum(bytes_received for _, bytes_received in results)
+
+    print(f"{args.clients} clients for {elapsed:.1f}s, {upstream_requests} upstream requests")
+    print(f"requests:  {total} ({total / elapsed:.0f} req/s), {errors} errors, "
+          f"{received / max(total, 1) / 1024:.1f} KiB per response{'' if args.no_gzip else ' (gzip)'}")
+    for operation, values in sorted(latencies.items()) + [("all", [v for vs in latencies.values() for v in vs])]:
+        values.sort()
+        print(f"{operation:<15} {len(values):7d}  p50 {percentile(values, 0.5):8.2f} ms  "
+              f"p90 {percentile(values, 0.9):8.2f} ms  p99 {percentile(values, 0.99):8.2f} ms  "
+              f"max {values[-1] if values else 0:8.2f} ms")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Benchmark suite for the hot paths, compared against a stored baseline
+
+Covers the deck parsers, card fetching, stats and DeckViewerAPI.get_deck_info end to end, on
+generated decks of realistic and extreme sizes. Card data comes from an in-process fake
+cardinfo.php server with configurable latency and error rates. Fetching cases run both with a
+cold and a warm card cache. Run from the repository root:
+    python -m benchmarks.run                         # compare with benchmarks/baseline.json
+    python -m benchmarks.run --out results.json      # also write the results
+    python -m benchmarks.run --update-baseline       # store the results as the new baseline
+
+Exits with status 1 when a case is slower than its baseline by more than --tolerance. Baselines
+are machine specific, regenerate them on the machine that runs the comparison.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app import card_service
+from app.api import DeckViewerAPI
+from app.deck_parser import Deck, OmegaFormatDecoder, OmegaFormatEncoder, parse_ydk_file, parse_ydke_url
+from benchmarks.fake_api import FakeCardInfoServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# (main, extra, side) card counts of the generated decks
+DECK_SIZES = {
+    "standard": (40, 15, 15),
+    "full": (60, 15, 15),
+    "extreme": (200, 55, 255),
+}
+
+# Passcodes decks are drawn from
+CARD_POOL = range(10000000, 10012000)
+
+
+def generate_deck(rng, size):
+    """A deck of the given size with one to three copies of each card"""
+    def section(count):
+        cards = []
+        while len(cards) < count:
+            cards += [rng.choice(CARD_POOL)] * rng.randint(1, 3)
+        return cards[:count]
+    main, extra, side = size
+    return Deck(section(main), section(extra), section(side))
+
+
+def to_ydk(deck):
+    lines = ["#created by benchmarks", "#main"] + [str(card_id) for card_id in deck.main.tolist()]
+    lines += ["#extra"] + [str(card_id) for card_id in deck.extra.tolist()]
+    lines += ["!side"] + [str(card_id) for card_id in deck.side.tolist()]
+    return "\n".join(lines) + "\n"
+
+
+def to_ydke(deck):
+    return "ydke://" + "".join(base64.b64encode(np.asarray(deck[section], dtype="<u4").tobytes()).decode() + "!"
+                               for section in ("main", "extra", "side"))
+
+
+def measure(func, repeat, number=1):
+    """Median milliseconds per call of func over repeat runs of number calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings) * 1e3
+
+
+def measure_cold(setup, func, repeat):
+    """Median milliseconds of func, running setup untimed before each call"""
+    timings = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3
+
+
+def run_suite(args):
+    rng = random.Random(args.seed)
+    decks = {name: generate_deck(rng, size) for name, size in DECK_SIZES.items()}
+    results = {}
+
+    # Parsers
+    decoder, encoder = OmegaFormatDecoder(), OmegaFormatEncoder()
+    with tempfile.TemporaryDirectory() as directory:
+        for name, deck in decks.items():
+            path = os.path.join(directory, f"{name}.ydk")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(to_ydk(deck))
+            ydke_url = to_ydke(deck)
+            omega = encoder.encode(deck)
+            assert parse_ydk_file(path, verbose=False) == deck
+            assert parse_ydke_url(ydke_url) == deck
+            # Omega strings don't record where the main deck ends, only compare the card order
+            decoded = decoder.decode(omega)
+            assert decoded.all_ids().tolist() == deck.all_ids().tolist() and len(decoded) == len(deck)
+
+            results[f"parse_ydk_file/{name}"] = measure(lambda: parse_ydk_file(path, verbose=False),
+                                                        args.repeat, number=200)
+            results[f"parse_ydke_url/{name}"] = measure(lambda: parse_ydke_url(ydke_url), args.repeat, number=200)
+            results[f"omega_decode/{name}"] = measure(lambda: decoder.decode(omega), args.repeat, number=200)
+
+    # Card fetching, stats and the API against the fake server
+    with FakeCardInfoServer(latency=args.latency, error_rate=args.error_rate,
+                            throttle_rate=args.throttle_rate, seed=args.seed) as server:
+        card_service.API_URL = server.url
+        card_service.configure_fetcher(rate_limit=args.rate_limit)
+
+        for name in ("standard", "extreme"):
+            deck = decks[name]
+            card_ids = deck.all_ids().tolist()
+
+            def fetch_each():
+                for card_id in card_ids:
+                    card_service.fetch_card_details(card_id)
+
+            def fetch_many():
+                card_service.fetch_card_details_many(card_ids)
+
+            if name == "standard":
+                # One request per card, too slow to repeat for the extreme deck
+                results[f"fetch_card_details/cold/{name}"] = measure_cold(card_service.card_cache.clear,
+                                                                          fetch_each, args.repeat)
+            results[f"fetch_card_details_many/cold/{name}"] = measure_cold(card_service.card_cache.clear,
+                                                                           fetch_many, args.repeat)
+            fetch_many()
+            results[f"fetch_card_details/warm/{name}"] = measure(fetch_each, args.repeat, number=20)
+            results[f"get_deck_stats/warm/{name}"] = measure(
+                lambda: card_service.get_deck_stats(deck, card_service.fetch_card_details), args.repeat, number=20)
+
+            api = DeckViewerAPI()
+            api.deck = deck
+
+            def forget_deck(clear_cards):
+                def setup():
+                    api.close_deck(deck.content_hash)
+                    api.deck = deck
+                    if clear_cards:
+                        card_service.card_cache.clear()
+                return setup
+
+            results[f"get_deck_info/cold/{name}"] = measure_cold(forget_deck(True), api.get_deck_info, args.repeat)
+            results[f"get_deck_info/warm/{name}"] = measure_cold(forget_deck(False), api.get_deck_info, args.repeat)
+            results[f"get_deck_info/memoised/{name}"] = measure(api.get_deck_info, args.repeat, number=200)
+
+        requests_sent, failures = server.request_count, server.failure_count
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate,
+            "rate_limit": args.rate_limit,
+            "repeat": args.repeat,
+            "fake_server_requests": requests_sent,
+            "fake_server_failures": failures,
+        },
+        "unit": "ms",
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Print every case next to its baseline and return the names of the regressions
+
+    A case regresses when it is both tolerance (relative) and min_delta milliseconds slower, so
+    sub-microsecond cases don't fail on timer noise.
+    """
+    regressions = []
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<{width}} {value:10.3f} ms  (new)")
+            continue
+        change = (value - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance and value - before > min_delta:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<{width}} {value:10.3f} ms  baseline {before:10.3f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the median is reported")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake server latency per request in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-limit", type=float, default=1000,
+                        help="client request rate limit, high by default so it does not dominate the timings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case regresses")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="smallest absolute slowdown that counts as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the baseline")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    regressions = compare(report["results"], baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import pytest
+
+from app import card_service
+from app.card_cache import CardCache
+from benchmarks.fake_api import AsyncFakeCardInfoServer, FakeCardInfoServer
+
+
+def _point_card_service_at(monkeypatch, server):
+    """Send card requests to server, with an empty cache, no store or catalogue and a fresh scheduler"""
+    monkeypatch.setattr(card_service, "API_URL", server.url)
+    monkeypatch.setattr(card_service, "card_cache", CardCache())
+    monkeypatch.setattr(card_service, "card_store", None)
+    monkeypatch.setattr(card_service, "catalogue", None)
+    monkeypatch.setattr(card_service, "_inflight", {})
+    for name in ("session", "scheduler", "_executor"):
+        monkeypatch.setattr(card_service, name, None)
+    card_service.configure_fetcher(rate_limit=1000)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """Point card_service at a local fake cardinfo.php with an empty cache and no store or catalogue"""
+    server = FakeCardInfoServer(latency=0.02).start()
+    _point_card_service_at(monkeypatch, server)
+
+    yield server
+
+    card_service._executor.shutdown(wait=True)
+    server.stop()
+
+
+@pytest.fixture
+def async_fake_api(monkeypatch):
+    """Like fake_api, with the asyncio fake server, which records how many requests it answers at once"""
+    pytest.importorskip("aiohttp")
+    server = AsyncFakeCardInfoServer(latency=0.02).start()
+    _point_card_service_at(monkeypatch, server)
+
+    yield server
+
+    card_service._executor.shutdown(wait=True)
+    server.stop()
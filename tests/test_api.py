@@ -0,0 +1,54 @@
+"""Tests of DeckViewerAPI deck loads against the fake cardinfo.php"""
+import threading
+import time
+
+import pytest
+
+from app import card_service, metrics
+from app.api import DeckViewerAPI
+
+
+@pytest.fixture
+def recorded_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def ydk_text(card_ids):
+    return "#main\n" + "\n".join(str(card_id) for card_id in card_ids) + "\n"
+
+
+def test_loading_another_deck_supersedes_the_running_load(fake_api, recorded_metrics):
+    max_workers = 2
+    card_service.configure_fetcher(max_workers=max_workers, rate_limit=1000)
+    fake_api.latency = 0.05
+    deck_a = list(range(9000, 9020))
+    deck_b = list(range(9100, 9104))
+    api = DeckViewerAPI(batch_chunk_size=1, async_fetch=False)
+
+    assert api.load_ydk_text(ydk_text(deck_a), "Deck A")["status"] == "success"
+    results = []
+    thread = threading.Thread(target=lambda: results.append(api.get_deck_info()))
+    thread.start()
+    while fake_api.request_count < 2:
+        time.sleep(0.005)
+
+    requested_a = sum(fake_api.passcode_counts[card_id] for card_id in deck_a)
+    assert api.load_ydk_text(ydk_text(deck_b), "Deck B")["status"] == "success"
+    info_b = api.get_deck_info(compact=True)
+    thread.join()
+
+    assert results[0]["status"] == "error" and results[0]["stale"] is True
+    assert info_b["status"] == "success"
+    assert [card_id for card_id, _ in info_b["deck"]["main"]] == deck_b
+    assert all(card["name"] == f"Fake Card {card_id}" for card_id, card in info_b["cards"].items())
+    # Only requests that had their slot when deck B was loaded may still arrive for deck A
+    assert sum(fake_api.passcode_counts[card_id] for card_id in deck_a) <= requested_a + max_workers
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["deck.superseded_fetches"] >= 1
+    assert counters["cards.wasted_requests"] >= 1
+    assert counters["deck.stale_results"] == 1
@@ -0,0 +1,63 @@
+"""Tests of app.async_card_service against the asyncio fake cardinfo.php"""
+import threading
+import time
+
+import pytest
+
+from app import card_service
+from app.deck_parser import Deck
+
+async_card_service = pytest.importorskip("app.async_card_service")
+
+
+def test_requests_in_flight_stay_within_the_concurrency_limit(async_fake_api):
+    card_service.configure_fetcher(max_workers=4, rate_limit=1000)
+    card_ids = list(range(8000, 8040))
+
+    cards = async_card_service.fetch_card_details_many_sync(card_ids, chunk_size=1)
+
+    assert list(cards) == card_ids
+    assert async_fake_api.request_count == len(card_ids)
+    assert 1 < async_fake_api.max_in_flight <= 4
+
+
+def test_cancelled_fetch_sends_no_further_requests(async_fake_api):
+    max_workers = 2
+    card_service.configure_fetcher(max_workers=max_workers, rate_limit=1000)
+    async_fake_api.latency = 0.05
+    card_ids = list(range(8100, 8140))
+    cancel = card_service.CancelToken()
+    errors = []
+
+    def load():
+        try:
+            async_card_service.fetch_card_details_many_sync(card_ids, chunk_size=1, cancel=cancel)
+        except card_service.FetchCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=load)
+    thread.start()
+    while async_fake_api.request_count < 4:
+        time.sleep(0.005)
+    sent = async_fake_api.request_count
+    cancel.cancel()
+    thread.join()
+
+    # Only requests that had their slot when the fetch was cancelled may still arrive
+    time.sleep(0.3)
+    assert len(errors) == 1
+    assert async_fake_api.request_count <= sent + max_workers
+    assert not card_service._inflight
+
+
+def test_async_deck_stats_match_the_blocking_ones(async_fake_api):
+    deck = Deck(main=[8200, 8201, 8201, 8202, 8203, 8203, 8203], extra=[8204, 8205], side=[8206])
+
+    async_stats = async_card_service.submit(async_card_service.get_deck_stats_async(deck)).result()
+    requests = async_fake_api.request_count
+    card_service.card_cache.clear()
+    stats = card_service.get_deck_stats(deck, card_service.fetch_card_details)
+
+    assert requests == 1
+    assert async_fake_api.request_count == 2
+    assert async_stats == stats
@@ -0,0 +1,175 @@
+"""Tests of the card fetches of app.card_service: single-flight stress tests (claim_cards, abandon_cards),
+concurrency and cache accounting"""
+import random
+import threading
+import time
+
+import pytest
+
+from app import card_service
+
+THREADS = 32
+
+
+def run_threads(target, count=THREADS):
+    """Run target(index) on count threads started together, returns their results in index order"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def run(index):
+        barrier.wait()
+        try:
+            results[index] = target(index)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not errors, errors
+    return results
+
+
+def test_fetch_card_details_sends_one_request_per_card(fake_api):
+    card_ids = list(range(1000, 1020))
+
+    def fetch(index):
+        order = card_ids[:]
+        random.Random(index).shuffle(order)
+        return {card_id: card_service.fetch_card_details(card_id) for card_id in order}
+
+    results = run_threads(fetch)
+
+    assert fake_api.request_count == len(card_ids)
+    assert all(count == 1 for count in fake_api.passcode_counts.values())
+    assert card_service._inflight == {}
+    for cards in results:
+        assert {card_id: card.name for card_id, card in cards.items()} == \
+            {card_id: f"Fake Card {card_id}" for card_id in card_ids}
+
+
+def test_overlapping_bulk_fetches_ask_for_each_card_once(fake_api):
+    pool = list(range(2000, 2300))
+
+    def fetch(index):
+        card_ids = random.Random(index).sample(pool, 120)
+        return card_ids, card_service.fetch_card_details_many(card_ids, chunk_size=10)
+
+    results = run_threads(fetch)
+
+    requested = set().union(*(card_ids for card_ids, _ in results))
+    assert set(fake_api.passcode_counts) == requested
+    assert all(count == 1 for count in fake_api.passcode_counts.values())
+    assert card_service._inflight == {}
+    for card_ids, cards in results:
+        assert list(cards) == card_ids
+        assert all(not card.missing and card.name == f"Fake Card {card_id}" for card_id, card in cards.items())
+
+
+def test_waiters_get_the_placeholder_of_a_failed_fetch(fake_api):
+    card_service.configure_fetcher(rate_limit=1000, max_retries=0)
+    fake_api.error_rate = 1.0
+    card_ids = list(range(3000, 3010))
+
+    results = run_threads(lambda index: card_service.fetch_card_details_many(card_ids))
+
+    assert sum(fake_api.passcode_counts.values()) == len(card_ids)
+    assert card_service._inflight == {}
+    for cards in results:
+        assert all(card.type == "Error" for card in cards.values())
+
+
+def test_cancelled_owner_hands_its_cards_to_waiters(fake_api):
+    card_ids = list(range(4000, 4100))
+    token = card_service.CancelToken()
+    owner_started = threading.Event()
+
+    def fetch(index):
+        if index == 0:
+            owner_started.set()
+            try:
+                card_service.fetch_card_details_many(card_ids, chunk_size=1, cancel=token)
+            except card_service.FetchCancelled:
+                return None
+            return None
+        owner_started.wait()
+        if index == 1:
+            token.cancel()
+        return card_service.fetch_card_details_many(card_ids, chunk_size=10)
+
+    results = run_threads(fetch, count=8)
+
+    assert card_service._inflight == {}
+    assert set(fake_api.passcode_counts) == set(card_ids)
+    for cards in results[1:]:
+        assert list(cards) == card_ids
+        assert all(card.name == f"Fake Card {card_id}" for card_id, card in cards.items())
+
+
+def test_abandoned_claims_fail_their_waiters():
+    card_ids = [5000, 5001]
+    owned, waiting = card_service.claim_cards(card_ids)
+    try:
+        assert set(owned) == set(card_ids) and not waiting
+        _, shared = card_service.claim_cards(card_ids)
+        assert shared == owned
+    finally:
+        card_service.abandon_cards(card_ids, RuntimeError("card fetch was abandoned"))
+
+    assert all(isinstance(future.exception(), RuntimeError) for future in owned.values())
+    assert all(card_id not in card_service._inflight for card_id in card_ids)
+
+
+def cold_load_seconds(card_ids, max_workers):
+    """Wall time of fetching card_ids one request each, starting from an empty cache"""
+    card_service.configure_fetcher(max_workers=max_workers, rate_limit=1000)
+    card_service.card_cache.clear()
+    start = time.perf_counter()
+    cards = card_service.fetch_card_details_many(card_ids, chunk_size=1)
+    elapsed = time.perf_counter() - start
+    assert all(card.name == f"Fake Card {card_id}" for card_id, card in cards.items())
+    return elapsed
+
+
+def test_cold_load_time_drops_by_the_concurrency_factor(fake_api):
+    fake_api.latency = 0.05
+    card_ids = list(range(6000, 6032))
+    max_workers = 8
+
+    serial = cold_load_seconds(card_ids, max_workers=1)
+    parallel = cold_load_seconds(card_ids, max_workers=max_workers)
+
+    assert fake_api.request_count == 2 * len(card_ids)
+    assert serial / parallel >= max_workers / 2
+
+
+def cache_counts():
+    stats = card_service.card_cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_each_requested_card_counts_one_cache_lookup(fake_api):
+    card_service.fetch_card_details_many([7000, 7001, 7002])
+    assert cache_counts() == (0, 3)
+
+    card_service.fetch_card_details_many([7000, 7001, 7002, 7003])
+    assert cache_counts() == (3, 4)
+
+    card_service.fetch_card_details(7004)
+    card_service.fetch_card_details(7004)
+    assert cache_counts() == (4, 5)
+
+
+def test_async_fetches_count_one_cache_lookup_per_card(fake_api):
+    pytest.importorskip("aiohttp")
+    from app import async_card_service
+
+    async_card_service.fetch_card_details_many_sync([7100, 7101, 7102])
+    assert cache_counts() == (0, 3)
+
+    async_card_service.fetch_card_details_many_sync([7100, 7101, 7102])
+    assert cache_counts() == (3, 3)
@@ -0,0 +1,40 @@
+"""YDK parsing edge cases of app.deck_parser, each checked against the Deck it should produce"""
+import codecs
+
+import pytest
+
+from app.deck_parser import parse_ydk_bytes, parse_ydk_file
+
+DECK = b"#created by test\n#main\n89631139\n46986414\n#extra\n12345\n!side\n67890\n"
+EXPECTED = {"main": [89631139, 46986414], "extra": [12345], "side": [67890]}
+
+
+@pytest.mark.parametrize("data", [
+    DECK.replace(b"\n", b"\r\n"),
+    DECK.replace(b"\n", b"\r"),
+    codecs.BOM_UTF8 + DECK,
+    codecs.BOM_UTF8 + DECK.replace(b"\n", b"\r\n"),
+], ids=["crlf", "lone-cr", "bom", "bom-crlf"])
+def test_line_endings_and_bom(data, tmp_path):
+    assert parse_ydk_bytes(data).to_dict() == EXPECTED
+
+    path = tmp_path / "deck.ydk"
+    path.write_bytes(data)
+    assert parse_ydk_file(str(path), verbose=False).to_dict() == EXPECTED
+
+
+def test_comment_and_junk_lines_inside_sections_are_skipped():
+    data = (b"junk before main\n12\n#main\n89631139\n#a comment\nnot a card\n12 34\n\n"
+            b"  46986414\t\n#extra\n12345\n1x\n!side\n67890\n# trailing comment\n")
+    assert parse_ydk_bytes(data).to_dict() == EXPECTED
+
+
+def test_markers_must_be_alone_on_their_line():
+    data = (b"#main\n89631139\n#main deck ends below\n46986414\n# see #extra\n"
+            b"#extra\n12345\nnot !side\n!side\n67890\n")
+    assert parse_ydk_bytes(data).to_dict() == EXPECTED
+
+
+def test_ids_outside_the_uint32_range_are_dropped():
+    data = b"#main\n89631139\n4294967296\n9999999999\n4294967295\n#extra\n12345\n!side\n67890\n"
+    assert parse_ydk_bytes(data).to_dict() == {"main": [89631139, 4294967295], "extra": [12345], "side": [67890]}
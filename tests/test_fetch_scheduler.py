@@ -0,0 +1,87 @@
+"""Retries and AIMD backoff of app.fetch_scheduler against injected 503s, 429s, stalls and resets"""
+import pytest
+
+from app import card_service
+
+
+def configure(max_retries, max_workers=8):
+    """Fetcher with short timeouts and backoff, so stalls and retries don't slow the tests down"""
+    card_service.configure_fetcher(max_workers=max_workers, rate_limit=1000, timeout=(1.0, 0.2),
+                                   max_retries=max_retries)
+    card_service.scheduler.backoff_base = 0.005
+    return card_service.scheduler
+
+
+def test_throttling_halves_the_concurrency_limit(fake_api):
+    scheduler = configure(max_retries=3)
+    fake_api.throttle_rate = 1.0
+
+    card = card_service.fetch_card_details(1000)
+
+    assert card.type == "Error"
+    assert fake_api.request_count == 4
+    assert scheduler.stats() == {"requests": 4, "retries": 3, "throttled": 4, "errors": 0, "concurrency_limit": 1}
+
+
+def test_successes_raise_the_concurrency_limit_again(fake_api):
+    scheduler = configure(max_retries=1)
+    fake_api.throttle_rate = 1.0
+    card_service.fetch_card_details(1000)
+    assert scheduler.concurrency.limit == 2
+
+    fake_api.throttle_rate = 0.0
+    card_service.fetch_card_details_many(list(range(2000, 2010)), chunk_size=1)
+
+    # Additive increase, +1/limit per success
+    expected = 2.0
+    for _ in range(10):
+        expected += 1 / expected
+    assert abs(scheduler.concurrency.limit - expected) < 1e-9
+    assert scheduler.stats()["concurrency_limit"] == int(expected) > 2
+
+
+def test_stalled_and_reset_requests_are_retried(fake_api):
+    scheduler = configure(max_retries=1)
+    fake_api.stall_time = 0.5
+
+    fake_api.stall_rate = 1.0
+    stalled = card_service.fetch_card_details(1000)
+    fake_api.stall_rate, fake_api.reset_rate = 0.0, 1.0
+    reset = card_service.fetch_card_details(1001)
+
+    assert stalled.type == "Error" and reset.type == "Error"
+    assert fake_api.failure_counts == {"stall": 2, "reset": 2}
+    assert scheduler.stats() == {"requests": 4, "retries": 2, "throttled": 0, "errors": 4, "concurrency_limit": 8}
+
+
+def test_fetches_survive_mixed_failures(fake_api):
+    scheduler = configure(max_retries=8)
+    fake_api.stall_time = 0.5
+    fake_api.error_rate = fake_api.throttle_rate = fake_api.stall_rate = fake_api.reset_rate = 0.05
+    card_ids = list(range(3000, 3200))
+
+    cards = card_service.fetch_card_details_many(card_ids, chunk_size=1)
+
+    assert all(card.name == f"Fake Card {card_id}" for card_id, card in cards.items())
+    failures = fake_api.failure_counts
+    assert all(failures[failure] for failure in (503, 429, "stall", "reset"))
+    stats = scheduler.stats()
+    assert stats["requests"] == fake_api.request_count == len(card_ids) + sum(failures.values())
+    assert stats["retries"] == sum(failures.values())
+    assert stats["throttled"] == failures[429]
+    assert stats["errors"] == failures["stall"] + failures["reset"]
+    assert card_service._inflight == {}
+
+
+def test_async_requests_go_through_the_scheduler(fake_api):
+    pytest.importorskip("aiohttp")
+    from app import async_card_service
+
+    scheduler = configure(max_retries=1)
+    fake_api.throttle_rate = 1.0
+
+    cards = async_card_service.fetch_card_details_many_sync([1000])
+
+    assert cards[1000].type == "Error"
+    assert fake_api.request_count == 2
+    assert scheduler.stats() == {"requests": 2, "retries": 1, "throttled": 2, "errors": 0, "concurrency_limit": 2}